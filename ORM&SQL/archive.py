@@ -0,0 +1,203 @@
+"""
+Архівація історичних даних: старі бронювання переносяться в помісячні таблиці
+reservations_archive_РРРР_ММ, а матчі завершених сезонів — у Matchs_archive_<сезон>.
+Робочі таблиці лишаються малими, тож перевірки доступності та JOIN не читають історію.
+Функції читання за замовчуванням працюють лише з робочими таблицями, архіви додаються
+через include_archive=True (для бронювань — лише місяці, що потрапляють у проміжок).
+Архівні таблиці зберігають первинний ключ рядків, тож робочі таблиці оголошено з AUTOINCREMENT
+(id не повторюються після архівації); бази, створені до цього, потрібно перестворити.
+"""
+from datetime import datetime, timedelta
+import sys
+import time
+
+import sqlalchemy as db
+
+from intro_orm import registry, Table, Reservation, Matchs, Divisions, find_free_table
+
+ARCHIVE_METADATA = db.MetaData()
+
+# ---------- Архівні таблиці ----------
+# Таблиця з тими самими стовпцями, що й source (без зовнішніх ключів та значень за замовчуванням)
+def archive_table(source, suffix):
+    name = f"{source.name}_archive_{suffix}"
+    table = ARCHIVE_METADATA.tables.get(name)
+    if table is None:
+        table = db.Table(name, ARCHIVE_METADATA, *(
+            db.Column(column.name, column.type, primary_key=column.primary_key) for column in source.columns
+        ))
+    return table
+
+# Наявні в базі архіви таблиці source, відсортовані за суфіксом
+def archive_tables(conn, source):
+    prefix = f"{source.name}_archive_"
+    return [
+        archive_table(source, name[len(prefix):])
+        for name in sorted(db.inspect(conn).get_table_names()) if name.startswith(prefix)
+    ]
+
+# Перенесення рядків source, що задовольняють condition, в archive (в поточній транзакції)
+def move_rows(session, source, archive, condition):
+    archive.create(session.connection(), checkfirst=True)
+    columns = [column.name for column in source.columns]
+    moved = session.execute(
+        db.insert(archive).from_select(columns, db.select(*source.columns).where(condition))
+    ).rowcount
+    session.execute(db.delete(source).where(condition))
+    return moved
+
+# Робоча таблиця разом з архівами як один підзапит (UNION ALL)
+def with_archives(source, archives):
+    if not archives:
+        return source
+    return db.union_all(db.select(source), *(db.select(archive) for archive in archives)).subquery(source.name)
+
+# ---------- Бронювання ----------
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+def next_month(moment):
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+# Перенесення бронювань, що закінчились не пізніше cutoff, у помісячні архіви однією транзакцією.
+# Бронювання, що ще триває після cutoff, лишається в робочій таблиці: пошук вільних столиків
+# читає лише її, тож інакше столик можна було б забронювати вдруге.
+# BEGIN IMMEDIATE не дає паралельним бронюванням змінювати таблицю під час перенесення.
+def archive_reservations(cutoff, database="restaurant"):
+    reservations = Reservation.__table__
+    # Кінець бронювання в цілих секундах, як у запиті вільних столиків (intro_orm.build_free_tables_query)
+    finished = (
+        db.cast(db.func.strftime("%s", reservations.c.reserved_at), db.Integer) + reservations.c.duration_minutes * 60
+        <= db.cast(db.func.strftime("%s", db.literal(cutoff, db.DateTime)), db.Integer)
+    )
+    moved = {}
+    with registry.unit_of_work(database, immediate=True) as session:
+        oldest = session.scalar(db.select(db.func.min(reservations.c.reserved_at)))
+        if oldest is None or oldest >= cutoff:
+            return moved
+        month = month_start(oldest)
+        while month < cutoff:
+            # Діапазон по індексу reserved_at, а не strftime('%Y_%m', ...) по всій таблиці
+            condition = db.and_(reservations.c.reserved_at >= month,
+                                reservations.c.reserved_at < min(next_month(month), cutoff), finished)
+            count = move_rows(session, reservations, archive_table(reservations, f"{month:%Y_%m}"), condition)
+            if count:
+                moved[f"{month:%Y_%m}"] = count
+            month = next_month(month)
+    print(f"Архівовано {sum(moved.values())} бронювань у {len(moved)} місячних таблиць")
+    return moved
+
+# Бронювання з початком у [start, end); include_archive=True додає лише потрібні місячні архіви
+def reservations_between(start, end, include_archive=False, database="restaurant"):
+    reservations = Reservation.__table__
+    with registry.reading(database) as session:
+        source = reservations
+        if include_archive:
+            first, last = f"{month_start(start):%Y_%m}", f"{end:%Y_%m}"
+            archives = [archive for archive in archive_tables(session.connection(), reservations)
+                        if first <= archive.name[-7:] <= last]
+            source = with_archives(reservations, archives)
+        return session.execute(
+            db.select(source.c.id, source.c.table_id, source.c.reserved_at, source.c.duration_minutes)
+            .where(source.c.reserved_at >= start, source.c.reserved_at < end)
+            .order_by(source.c.reserved_at, source.c.id)
+        ).all()
+
+# ---------- Матчі ----------
+# Матчі з Id <= last_match_id — завершений сезон season (наприклад, "2023_24")
+def archive_matches(season, last_match_id, database="core"):
+    with registry.unit_of_work(database) as session:
+        moved = move_rows(session, Matchs, archive_table(Matchs, season), Matchs.c.Id <= last_match_id)
+    print(f"Архівовано {moved} матчів сезону {season}")
+    return moved
+
+# JOIN Matchs та Divisions; include_archive=True — разом з усіма архівними сезонами
+def matches_with_divisions(include_archive=False, database="core"):
+    with registry.engine(database).connect() as conn:
+        matches = Matchs
+        if include_archive:
+            matches = with_archives(Matchs, archive_tables(conn, Matchs))
+        query = (
+            db.select(Divisions.c.Division, Divisions.c.Name, Divisions.c.Country,
+                      matches.c.HomeTeam, matches.c.FTHG, matches.c.FTAG)
+            .select_from(db.join(matches, Divisions, matches.c.Div == Divisions.c.Division))
+            .order_by(matches.c.Id)
+        )
+        return conn.execute(query).all()
+
+# ---------- Бенчмарк ----------
+# history_rows історичних бронювань за кілька років до "сьогодні" та тиждень поточних.
+# Затримка типових запитів до робочої таблиці вимірюється до та після архівації.
+def benchmark_archive(history_rows=10_000_000, tables_count=200, lookups=200):
+    import random
+
+    today = datetime(2025, 4, 18)
+
+    def measure(session):
+        moments = [today + timedelta(minutes=random.randrange(7 * 24 * 60)) for _ in range(lookups)]
+        began = time.perf_counter()
+        for moment in moments:
+            find_free_table(session, random.randint(2, 8), moment)
+        free_table_ms = (time.perf_counter() - began) / lookups * 1000
+        # Бронювання дня (як у кеші календаря) та агрегат по всій робочій таблиці
+        began = time.perf_counter()
+        for moment in moments[:20]:
+            session.execute(db.select(Reservation.table_id, Reservation.reserved_at).where(
+                Reservation.reserved_at >= moment, Reservation.reserved_at < moment + timedelta(days=1))).all()
+        day_ms = (time.perf_counter() - began) / 20 * 1000
+        began = time.perf_counter()
+        session.execute(db.select(Reservation.table_id, db.func.count()).group_by(Reservation.table_id)).all()
+        report_ms = (time.perf_counter() - began) * 1000
+        return free_table_ms, day_ms, report_ms
+
+    with registry.temporary("restaurant"):
+        with registry.unit_of_work("restaurant") as session:
+            session.execute(db.insert(Table),
+                            [{"seats": random.randint(2, 8)} for _ in range(tables_count)])
+            # Історія генерується в SQLite рекурсивним CTE: бронювання кожні 30 хвилин,
+            # по колу для всіх столиків, закінчуючи напередодні "сьогодні"
+            first = today - timedelta(minutes=30 * (history_rows // tables_count + 1))
+            session.execute(db.text("""
+                INSERT INTO reservations (table_id, reserved_at, duration_minutes)
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :rows)
+                SELECT i % :tables + 1,
+                       strftime('%Y-%m-%d %H:%M:%S', :first, '+' || (i / :tables * 30) || ' minutes') || '.000000',
+                       60
+                FROM n
+            """), {"rows": history_rows, "tables": tables_count, "first": first.strftime("%Y-%m-%d %H:%M:%S")})
+            session.execute(db.insert(Reservation), [
+                {"table_id": random.randint(1, tables_count),
+                 "reserved_at": today + timedelta(minutes=30 * random.randrange(7 * 48)), "duration_minutes": 60}
+                for _ in range(5_000)
+            ])
+        session = registry.session("restaurant")
+        before = measure(session)
+        session.commit()
+        began = time.perf_counter()
+        archive_reservations(today)
+        archive_seconds = time.perf_counter() - began
+        after = measure(session)
+        session.commit()
+        for label, values in (("до архівації", before), ("після архівації", after)):
+            print(f"{label:>16}: пошук столика {values[0]:.3f} мс, бронювання дня {values[1]:.3f} мс, "
+                  f"звіт по столиках {values[2]:.1f} мс")
+        print(f"Архівація {history_rows:,} рядків: {archive_seconds:.1f} с")
+
+if __name__ == "__main__":
+    import intro_orm
+
+    # Бронювання за минулі місяці та поточне
+    intro_orm.add_table(4)
+    for moment in (datetime(2025, 1, 10, 18), datetime(2025, 2, 14, 19), datetime(2025, 4, 17, 18)):
+        intro_orm.book_table(2, moment)
+    archive_reservations(datetime(2025, 4, 1))
+    print("Лише робоча таблиця:", reservations_between(datetime(2025, 1, 1), datetime(2025, 5, 1)))
+    print("Разом з архівами:", reservations_between(datetime(2025, 1, 1), datetime(2025, 5, 1), include_archive=True))
+
+    intro_orm.core_demo()
+    archive_matches("2023_24", last_match_id=2)
+    print("Лише робоча таблиця:", matches_with_divisions())
+    print("Разом з архівами:", matches_with_divisions(include_archive=True))
+
+    if "--bench" in sys.argv:
+        benchmark_archive()
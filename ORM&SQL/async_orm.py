@@ -0,0 +1,225 @@
+"""
+Асинхронний доступ до моделей школи та ресторану через AsyncSession (aiosqlite).
+Бази та їхні налаштування беруться з того самого реєстру, що й у intro_orm.py:
+асинхронний двигун створюється ліниво для URL бази з драйвером sqlite+aiosqlite.
+Логіка, що вже є в синхронному коді (пошук вільного столика, розв'язання імен,
+оновлення агрегатів оцінок), перевикористовується через AsyncSession.run_sync.
+Функції не друкують повідомлень, а повертають результат — як обробники веб-запитів.
+"""
+import asyncio
+from contextlib import asynccontextmanager, redirect_stdout
+from datetime import datetime
+import io
+import sys
+import time
+
+import sqlalchemy as db
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import intro_orm
+from intro_orm import (
+    registry, SESSION_ENGINE_KEY, apply_pragmas_on_connect, begin_immediate,
+    Table, Reservation, MAX_RESERVATION_MINUTES, find_free_table,
+    Student, Subject, Grade, StudentStats, resolve_ids, update_grade_stats,
+    grade_loader_options, grade_details,
+)
+
+# ---------- Реєстр асинхронних двигунів ----------
+# Двигуни прив'язані до циклу подій, в якому відкрито їхні з'єднання,
+# тож перед завершенням циклу потрібно викликати await async_registry.dispose().
+class AsyncDatabaseRegistry:
+    def __init__(self, sync_registry):
+        self._registry = sync_registry
+        self._engines = {}
+        self._sessionmakers = {}
+
+    def engine(self, name):
+        engine = self._engines.get(name)
+        if engine is None:
+            # Синхронний двигун один раз створює таблиці бази
+            self._registry.engine(name)
+            settings = self._registry.settings(name)
+            url = db.make_url(settings["url"]).set(drivername="sqlite+aiosqlite")
+            engine = create_async_engine(url, **settings["options"])
+            if settings["concurrent"] is not None:
+                apply_pragmas_on_connect(engine.sync_engine, {
+                    "journal_mode": "WAL",
+                    "synchronous": "NORMAL",
+                    "busy_timeout": settings["concurrent"]["busy_timeout_ms"],
+                })
+            self._engines[name] = engine
+            # Той самий клас сесій і двигун реєстру в info, що й у синхронних сесій бази:
+            # обробники listen_sessions (кеші календаря та користувачів) бачать і асинхронні зміни
+            self._sessionmakers[name] = async_sessionmaker(
+                engine, expire_on_commit=False, sync_session_class=self._registry.session_class(name),
+                info={SESSION_ENGINE_KEY: self._registry.engine(name)},
+            )
+        return engine
+
+    def session(self, name):
+        self.engine(name)
+        return self._sessionmakers[name]()
+
+    # Одиниця роботи: commit при успішному виході, rollback при виключенні.
+    # immediate=True — BEGIN IMMEDIATE, як у синхронному registry.unit_of_work
+    @asynccontextmanager
+    async def unit_of_work(self, name, immediate=False):
+        async with self.session(name) as session:
+            try:
+                if immediate:
+                    await session.run_sync(begin_immediate)
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
+        self._sessionmakers.clear()
+
+async_registry = AsyncDatabaseRegistry(registry)
+
+# ---------- Ресторан ----------
+async def add_table(seats, database="restaurant"):
+    async with async_registry.unit_of_work(database) as session:
+        table = Table(seats=seats)
+        session.add(table)
+    return table
+
+# Пошук і вставка в одній транзакції BEGIN IMMEDIATE; повертає бронювання або None
+async def book_table(requested_seats, desired_time, duration_minutes=60, database="restaurant"):
+    if not 0 < duration_minutes <= MAX_RESERVATION_MINUTES:
+        raise ValueError(f"Тривалість бронювання має бути від 1 до {MAX_RESERVATION_MINUTES} хвилин")
+    async with async_registry.unit_of_work(database, immediate=True) as session:
+        table = await session.run_sync(find_free_table, requested_seats, desired_time, duration_minutes)
+        if table is None:
+            return None
+        reservation = Reservation(table_id=table.id, reserved_at=desired_time, duration_minutes=duration_minutes)
+        session.add(reservation)
+    return reservation
+
+# ---------- Школа ----------
+# Повертають створений запис або None, якщо студент (предмет) з таким ім'ям вже існує
+async def add_student(name, group):
+    try:
+        async with async_registry.unit_of_work("school") as session:
+            student = Student(name=name, group=group)
+            session.add(student)
+    except db.exc.IntegrityError:
+        return None
+    return student
+
+async def add_subject(name):
+    try:
+        async with async_registry.unit_of_work("school") as session:
+            subject = Subject(name=name)
+            session.add(subject)
+    except db.exc.IntegrityError:
+        return None
+    return subject
+
+# Оцінка та агрегати — однією транзакцією; None, якщо студента чи предмет не знайдено
+async def give_grade(student_name, subject_name, value):
+    async with async_registry.unit_of_work("school") as session:
+        student_id = (await session.run_sync(resolve_ids, Student, [student_name])).get(student_name)
+        subject_id = (await session.run_sync(resolve_ids, Subject, [subject_name])).get(subject_name)
+        if student_id is None or subject_id is None:
+            return None
+        grade = Grade(student_id=student_id, subject_id=subject_id, value=value)
+        session.add(grade)
+        await session.run_sync(update_grade_stats, {student_id: (1, value)}, {subject_id: (1, value)})
+    return grade
+
+async def student_average(name):
+    query = (
+        db.select(Student.id, Student.name, StudentStats.average, StudentStats.grades_count)
+        .outerjoin(StudentStats, StudentStats.student_id == Student.id)
+        .where(Student.name == name)
+        .order_by(Student.id)
+    )
+    async with async_registry.session("school") as session:
+        return [
+            {"id": student_id, "name": student_name, "average": avg, "grades_count": count or 0}
+            for student_id, student_name, avg, count in await session.execute(query)
+        ]
+
+# with_grades=True потребує жадібного профілю ("selectin" або "joined"): ледаче
+# завантаження зв'язків в AsyncSession неможливе
+async def list_honors(threshold=90, with_grades=False, loading=intro_orm.DEFAULT_LOADING):
+    query = (
+        db.select(Student, StudentStats.average)
+        .join(StudentStats, StudentStats.student_id == Student.id)
+        .where(StudentStats.average >= threshold)
+        .order_by(Student.id)
+    )
+    if with_grades:
+        query = query.options(*grade_loader_options(loading))
+    async with async_registry.session("school") as session:
+        result = await session.execute(query)
+        return [
+            {"id": student.id, "name": student.name, "average": avg,
+             **({"grades": grade_details(student)} if with_grades else {})}
+            for student, avg in result.unique()
+        ]
+
+# ---------- Бенчмарк ----------
+# Запити виконуються одночасно (asyncio.gather): синхронні функції — через пул потоків
+# циклу подій (asyncio.to_thread), асинхронні — напряму в циклі подій.
+def benchmark_async(requests_count=2_000, students_count=200):
+    names = [f"Student {i}" for i in range(students_count)]
+
+    def sync_in_threadpool(func, *args):
+        def call():
+            try:
+                return func(*args)
+            finally:
+                registry.remove("school")
+        return asyncio.to_thread(call)
+
+    cases = (
+        ("student_average", lambda i: sync_in_threadpool(intro_orm.student_average, names[i % students_count], True),
+         lambda i: student_average(names[i % students_count])),
+        ("give_grade", lambda i: sync_in_threadpool(intro_orm.give_grade, names[i % students_count], "Math", 90),
+         lambda i: give_grade(names[i % students_count], "Math", 90)),
+    )
+
+    async def run(make_request):
+        with redirect_stdout(io.StringIO()):
+            began = time.perf_counter()
+            await asyncio.gather(*(make_request(i) for i in range(requests_count)))
+            elapsed = time.perf_counter() - began
+        await async_registry.dispose()
+        return requests_count / elapsed
+
+    with registry.temporary("school"):
+        with registry.unit_of_work("school") as session:
+            session.execute(db.insert(Student.__table__), [{"name": name, "group": "Bench"} for name in names])
+            session.execute(db.insert(Subject.__table__), [{"name": "Math"}])
+        with redirect_stdout(io.StringIO()):
+            intro_orm.give_grades_bulk((name, "Math", 80) for name in names)
+        for label, threaded, native in cases:
+            threaded_rps = asyncio.run(run(threaded))
+            native_rps = asyncio.run(run(native))
+            print(f"{label:>16}: потоки {threaded_rps:,.0f} запитів/с, AsyncSession {native_rps:,.0f} запитів/с")
+        mismatches = intro_orm.check_grade_stats()
+    return not mismatches
+
+async def demo():
+    await add_table(4)
+    print("Бронювання:", await book_table(2, datetime(2025, 4, 17, 18, 0)))
+    print("Повторне бронювання:", await book_table(4, datetime(2025, 4, 17, 18, 30)))
+    for name in ("Bob", "Alice"):
+        await add_student(name, "Python")
+    await add_subject("Math")
+    await asyncio.gather(give_grade("Bob", "Math", 95), give_grade("Alice", "Math", 88))
+    print("Середній бал Bob:", await student_average("Bob"))
+    print("Відмінники:", await list_honors(with_grades=True))
+    await async_registry.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(demo())
+    if "--bench" in sys.argv:
+        benchmark_async()
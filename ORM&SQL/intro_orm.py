@@ -1,66 +1,322 @@
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
 import sqlalchemy as db
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base, relationship, Session
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+import csv
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 
-# ---------- Підключення до бази даних та налаштування ----------
-# Створюємо двигун для SQLite бази example.sqlite
-engine = create_engine("sqlite:///example.sqlite")
-# Підключаємось до бази
-conn = engine.connect()
+# ---------- Реєстр двигунів і сесій ----------
+# Двигуни створюються ліниво при першому зверненні до бази, тому імпорт модуля
+# не відкриває файлів і не створює таблиць. Для кожної бази — свій пул з'єднань
+# та scoped_session (окрема сесія на кожен потік).
+
+# Параметри пулу за замовчуванням для create_engine
+DEFAULT_ENGINE_OPTIONS = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30}
+
+# Параметри create_engine для url: параметри пулу (за замовчуванням і pool_options) додаються
+# лише для QueuePool (файлові бази). SingletonThreadPool та StaticPool (sqlite:// у пам'яті) їх не приймають.
+def engine_options(url, options, **pool_options):
+    url = db.make_url(url)
+    pool_class = options.get("poolclass") or url.get_dialect().get_pool_class(url)
+    if issubclass(pool_class, db.pool.QueuePool):
+        return {**DEFAULT_ENGINE_OPTIONS, **options, **pool_options}
+    return dict(options)
+
+# PRAGMA, що виконуються для кожного нового з'єднання пулу
+def apply_pragmas_on_connect(engine, pragmas):
+    @db.event.listens_for(engine, "connect")
+    def set_connection_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# Захоплення блокування на запис SQLite на початку транзакції сесії.
+# pysqlite відкриває транзакцію лише перед першим INSERT/UPDATE, тож послідовність
+# "перевірити SELECT-ом, потім вставити" не атомарна: два потоки можуть пройти перевірку
+# одночасно. Після BEGIN IMMEDIATE інші записувачі чекають (до timeout з'єднання)
+# на commit або rollback цієї транзакції, а читачі не блокуються.
+def begin_immediate(session):
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    # Якщо транзакція вже щось записала, блокування на запис і так утримується
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+# Ключ session.info з двигуном реєстру, для бази якого створено сесію
+SESSION_ENGINE_KEY = "registry_engine"
+
+class DatabaseRegistry:
+    def __init__(self):
+        self._configs = {}
+        self._engines = {}
+        self._sessions = {}
+        self._read_engines = {}
+        self._read_sessions = {}
+        self._session_classes = {}  # name -> підклас Session з обробниками listen_sessions
+        self._lock = threading.Lock()
+
+    # Реєстрація або зміна налаштувань бази до першого звернення до неї.
+    # engine_options передаються в create_engine (pool_size, max_overflow, echo, ...)
+    # поверх DEFAULT_ENGINE_OPTIONS (див. engine_options).
+    def configure(self, name, url=None, metadata=None, **engine_options):
+        with self._lock:
+            if name in self._engines:
+                raise RuntimeError(f"База {name} вже ініціалізована, налаштування змінити не можна")
+            config = self._configs.setdefault(
+                name, {"url": None, "metadata": None, "options": {}, "concurrent": None}
+            )
+            if url is not None:
+                config["url"] = url
+            if metadata is not None:
+                config["metadata"] = metadata
+            config["options"].update(engine_options)
+
+    # Конкурентний режим SQLite (вмикається до першого звернення до бази):
+    # WAL, busy_timeout і synchronous=NORMAL; усі записи йдуть через єдине з'єднання
+    # (пул розміром 1 — потоки-записувачі чекають у черзі пулу), а звіти читають
+    # через окремий пул з readers з'єднань у режимі query_only, не блокуючи записів.
+    def enable_concurrent_mode(self, name, readers=8, busy_timeout_ms=5000):
+        self.configure(name)
+        with self._lock:
+            self._configs[name]["concurrent"] = {"readers": readers, "busy_timeout_ms": busy_timeout_ms}
+
+    # Обробник події сесій бази name (after_flush, after_commit, do_orm_execute, ...).
+    # Реєструється на власному підкласі Session бази, а не на самому Session, тож інші сесії процесу
+    # його не викликають, а сесії, створені після dispose, і асинхронні сесії (async_orm.py) — викликають.
+    def listen_sessions(self, name, event, fn):
+        db.event.listen(self.session_class(name), event, fn)
+
+    # Підклас Session для сесій бази name; в info кожної сесії — двигун реєстру (SESSION_ENGINE_KEY),
+    # за яким кеші відрізняють сесії поточної бази від сесій бази до dispose + configure
+    def session_class(self, name):
+        with self._lock:
+            return self._session_class(name)
+
+    # Викликається під self._lock
+    def _session_class(self, name):
+        session_class = self._session_classes.get(name)
+        if session_class is None:
+            session_class = self._session_classes[name] = type(f"{name.title()}Session", (Session,), {})
+        return session_class
+
+    # Копія налаштувань бази: url, metadata, options (для create_engine), concurrent
+    def settings(self, name):
+        with self._lock:
+            if name not in self._configs:
+                raise KeyError(f"Невідома база {name}")
+            config = self._configs[name]
+            return {**config, "options": dict(config["options"])}
+
+    def engine(self, name):
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        with self._lock:
+            if name not in self._engines:
+                if name not in self._configs:
+                    raise KeyError(f"Невідома база {name}")
+                self._create_engines(name, self._configs[name])
+            return self._engines[name]
+
+    def _create_engines(self, name, config):
+        concurrent = config["concurrent"]
+        if concurrent is None:
+            engine = create_engine(config["url"], **engine_options(config["url"], config["options"]))
+        else:
+            engine = create_engine(config["url"], **engine_options(config["url"], config["options"],
+                                                                   pool_size=1, max_overflow=0))
+            apply_pragmas_on_connect(engine, {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "busy_timeout": concurrent["busy_timeout_ms"],
+            })
+        if config["metadata"] is not None:
+            config["metadata"].create_all(engine)
+        if concurrent is not None:
+            read_engine = create_engine(
+                config["url"], **engine_options(config["url"], config["options"],
+                                                pool_size=concurrent["readers"], max_overflow=0)
+            )
+            apply_pragmas_on_connect(read_engine, {
+                "busy_timeout": concurrent["busy_timeout_ms"],
+                "query_only": "ON",
+            })
+            self._read_engines[name] = read_engine
+            self._read_sessions[name] = scoped_session(sessionmaker(bind=read_engine))
+        self._sessions[name] = scoped_session(
+            sessionmaker(bind=engine, class_=self._session_class(name), info={SESSION_ENGINE_KEY: engine})
+        )
+        self._engines[name] = engine
+
+    # Тимчасова база name у файлі filename окремого тимчасового каталогу (для бенчмарків і перевірок).
+    # Усередині блоку всі звернення до name йдуть у нову базу (блок отримує шлях каталогу);
+    # після виходу двигуни закриваються, каталог видаляється, а name знову вказує на попередню адресу.
+    @contextmanager
+    def temporary(self, name, filename=None):
+        original_url = self.settings(name)["url"]
+        with tempfile.TemporaryDirectory() as tmp:
+            self.dispose()
+            self.configure(name, f"sqlite:///{os.path.join(tmp, filename or f'{name}.db')}")
+            try:
+                yield tmp
+            finally:
+                self.dispose()
+                self.configure(name, original_url)
+
+    # Сесія поточного потоку для бази name
+    def session(self, name):
+        self.engine(name)
+        return self._sessions[name]()
+
+    # Сесія для звітів: у конкурентному режимі — з пулу читачів (з'єднання повертається
+    # в пул після виходу з блоку), інакше — звичайна сесія поточного потоку
+    @contextmanager
+    def reading(self, name):
+        self.engine(name)
+        read_sessions = self._read_sessions.get(name)
+        if read_sessions is None:
+            yield self._sessions[name]()
+            return
+        session = read_sessions()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    # Одиниця роботи: commit при успішному виході, rollback при виключенні.
+    # immediate=True — блокування на запис з першого запиту (для перевірки та запису без гонок)
+    @contextmanager
+    def unit_of_work(self, name, immediate=False):
+        session = self.session(name)
+        try:
+            if immediate:
+                begin_immediate(session)
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    # Закриття сесій поточного потоку (наприклад, в кінці обробки HTTP-запиту)
+    def remove(self, name=None):
+        for sessions in (self._sessions, self._read_sessions):
+            for key in [name] if name else list(sessions):
+                if key in sessions:
+                    sessions[key].remove()
+
+    # Закриття всіх сесій та пулів; наступне звернення створить двигуни заново
+    def dispose(self):
+        with self._lock:
+            for scoped in (*self._sessions.values(), *self._read_sessions.values()):
+                scoped.remove()
+            for engine in (*self._engines.values(), *self._read_engines.values()):
+                engine.dispose()
+            self._sessions.clear()
+            self._read_sessions.clear()
+            self._engines.clear()
+            self._read_engines.clear()
+
+registry = DatabaseRegistry()
+
+# ---------- Відстеження змін для кешів у пам'яті процесу ----------
+# Один трекер на базу: обробники подій її сесій реєструються через listen_sessions, а зміни,
+# зібрані під час flush та session.execute, передаються підписникам лише після commit
+# (після rollback — відкидаються). Підписник (кеш) має:
+#   engine — двигун, з бази якого завантажено вміст кешу (None — кеш ще нічого не завантажив);
+#   reset(engine) — відкинути вміст і запам'ятати новий двигун;
+#   collect_flush(session, pending), collect_execute(orm_execute_state, pending) — дописати зміни в список pending;
+#   apply_changes(pending) — застосувати зміни закоміченої транзакції.
+class SessionChangeTracker:
+    def __init__(self, name):
+        self.name = name
+        self._subscribers = []
+        self._key = ("session_changes", name)
+        registry.listen_sessions(name, "after_flush", self._after_flush)
+        registry.listen_sessions(name, "do_orm_execute", self._on_execute)
+        registry.listen_sessions(name, "after_commit", self._after_commit)
+        registry.listen_sessions(name, "after_soft_rollback", self._after_rollback)
+
+    def subscribe(self, subscriber):
+        self._subscribers.append(subscriber)
+
+    # Двигун бази береться з реєстру при кожному зверненні кешу: якщо реєстр перестворив
+    # двигун (dispose + configure), вміст кешу попередньої бази відкидається
+    def sync(self, subscriber):
+        engine = registry.engine(self.name)
+        if engine is not subscriber.engine:
+            subscriber.reset(engine)
+
+    # Ім'я таблиці insert/update/delete; для ORM-операцій statement.table — анотована копія таблиці,
+    # тож підписники порівнюють імена, а не об'єкти таблиць
+    @staticmethod
+    def table_name(orm_execute_state):
+        return getattr(getattr(orm_execute_state.statement, "table", None), "name", None)
+
+    # [(підписник, список змін)] для підписників, чий вміст завантажено з бази цієї сесії
+    def _pending(self, session):
+        engine = session.info.get(SESSION_ENGINE_KEY)
+        tracked = [s for s in self._subscribers if s.engine is not None and engine is s.engine]
+        if not tracked:
+            return []
+        pending = session.info.setdefault(self._key, {})
+        return [(s, pending.setdefault(id(s), (s, []))[1]) for s in tracked]
+
+    def _after_flush(self, session, flush_context):
+        for subscriber, pending in self._pending(session):
+            subscriber.collect_flush(session, pending)
+
+    def _on_execute(self, orm_execute_state):
+        if orm_execute_state.is_select:
+            return
+        for subscriber, pending in self._pending(orm_execute_state.session):
+            subscriber.collect_execute(orm_execute_state, pending)
+
+    def _after_commit(self, session):
+        for subscriber, pending in session.info.pop(self._key, {}).values():
+            if pending:
+                subscriber.apply_changes(pending)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(self._key, None)
+
+CHANGE_TRACKERS = {}
+
+# Трекер змін бази name (створюється при першому зверненні)
+def change_tracker(name):
+    tracker = CHANGE_TRACKERS.get(name)
+    if tracker is None:
+        tracker = CHANGE_TRACKERS[name] = SessionChangeTracker(name)
+    return tracker
+
+# ---------- Визначення таблиці Student (рівень Core) ----------
 # Об'єкт для метаданих таблиць
 metadata = db.MetaData()
 
-# ---------- Визначення таблиці Student (рівень Core) ----------
-Student = db.Table(
+# StudentTable — Core-таблиця "Student" у example.sqlite (не плутати з ORM-моделлю Student нижче)
+StudentTable = db.Table(
     "Student", metadata,
     db.Column("Id", db.Integer, primary_key=True),
     db.Column("Name", db.String(255), nullable=False),
     db.Column("Major", db.String(255), default="Math"),
     db.Column("Pass", db.Boolean, default=True)
 )
-# Створюємо таблицю, якщо її ще не існує
-metadata.create_all(engine)
-
-# ---------- Вставка записів у таблицю Student ----------
-# Вставляємо одного студента через insert().values()
-query = db.insert(Student).values(Id=1, Name="Bob", Major="English", Pass=True)
-conn.execute(query)
-conn.commit()
-
-# Виводимо всі записи таблиці
-output = conn.execute(Student.select()).fetchall()
-print(output)
-
-# Масова вставка декількох записів
-query = db.insert(Student)
-values_list = [
-    {"Id": 2, "Name": "Alice", "Major": "Science", "Pass": False},
-    {"Id": 3, "Name": "Ben", "Major": "Math", "Pass": True},
-    {"Id": 4, "Name": "John", "Major": "English", "Pass": False}
-]
-conn.execute(query, values_list)
-conn.commit()
-print(conn.execute(Student.select()).fetchall())
-
-# ---------- CRUD: READ, UPDATE, DELETE для Student ----------
-# Фільтрація за Major == 'English'
-query = Student.select().where(Student.columns.Major == "English")
-print(conn.execute(query).fetchall())
-
-# Оновлення: позначаємо Pass=True для Alice
-query = Student.update().values(Pass=True).where(Student.columns.Name == "Alice")
-conn.execute(query)
-conn.commit()
-print(conn.execute(Student.select()).fetchall())
-
-# Видалення: видаляємо запис Ben
-query = Student.delete().where(Student.columns.Name == "Ben")
-conn.execute(query)
-conn.commit()
-print(conn.execute(Student.select()).fetchall())
-
-# ---------- Визначення та заповнення таблиць Divisions і Matchs ----------
+
+# ---------- Визначення таблиць Divisions і Matchs ----------
 Divisions = db.Table(
     "Divisions", metadata,
     db.Column("Division", db.String(10), primary_key=True),
@@ -73,42 +329,403 @@ Matchs = db.Table(
     db.Column("Div", db.String(10)),
     db.Column("HomeTeam", db.String(255)),
     db.Column("FTHG", db.Integer),
-    db.Column("FTAG", db.Integer)
+    db.Column("FTAG", db.Integer),
+    # AUTOINCREMENT: Id не використовуються повторно після архівації матчів (archive.py)
+    sqlite_autoincrement=True,
 )
-# Створюємо нові таблиці
-metadata.create_all(engine)
-
-# Вставляємо дані в Divisions
-conn.execute(db.insert(Divisions), [
-    {'Division': "E1", "Name": "Premier League", "Country": "England"},
-    {'Division': "D1", "Name": "Bundesliga", "Country": "Germany"}
-])
-# Вставляємо дані в Matchs
-conn.execute(db.insert(Matchs), [
-    {"Div": "E1", "HomeTeam": "Norwich", "FTHG": 1, "FTAG": 1},
-    {"Div": "E1", "HomeTeam": "Liverpool", "FTHG": 2, "FTAG": 1},
-    {"Div": "D1", "HomeTeam": "Bayern", "FTHG": 3, "FTAG": 0}
-])
-conn.commit()
+
+# Таблиці створюються при першому зверненні до бази
+registry.configure("core", "sqlite:///example.sqlite", metadata)
 
 # Приклад JOIN між Matchs та Divisions
-query_join = db.join(Matchs, Divisions, Matchs.c.Div == Divisions.c.Division)
-query_select = db.select(
-    Divisions.c.Division,
-    Divisions.c.Name,
-    Divisions.c.Country,
-    Matchs.c.HomeTeam,
-    Matchs.c.FTHG,
-    Matchs.c.FTAG
-).select_from(query_join)
-result = conn.execute(query_select).fetchall()
-for row in result:
-    print(row)
+def matches_with_divisions_query():
+    query_join = db.join(Matchs, Divisions, Matchs.c.Div == Divisions.c.Division)
+    return db.select(
+        Divisions.c.Division,
+        Divisions.c.Name,
+        Divisions.c.Country,
+        Matchs.c.HomeTeam,
+        Matchs.c.FTHG,
+        Matchs.c.FTAG
+    ).select_from(query_join)
+
+# ---------- Готові параметризовані Core-запити ----------
+# Оператори будуються один раз з bindparam замість нового select()/update() на кожен виклик.
+# Ключ кешу готового оператора обчислюється один раз, а скомпільований SQL береться
+# з compiled cache двигуна, тож виклик платить лише за підстановку параметрів і виконання.
+CORE_STATEMENTS = {
+    "students_by_major": StudentTable.select().where(StudentTable.c.Major == db.bindparam("major")),
+    "student_by_name": StudentTable.select().where(StudentTable.c.Name == db.bindparam("name")),
+    "insert_students": db.insert(StudentTable),
+    "set_student_pass": (
+        StudentTable.update()
+        .where(StudentTable.c.Name == db.bindparam("name"))
+        .values(Pass=db.bindparam("passed"))
+    ),
+    "delete_student": StudentTable.delete().where(StudentTable.c.Name == db.bindparam("name")),
+    "insert_divisions": db.insert(Divisions),
+    "insert_matches": db.insert(Matchs),
+    "matches_with_divisions": matches_with_divisions_query(),
+    "matches_by_division": matches_with_divisions_query().where(Divisions.c.Division == db.bindparam("division")),
+}
+
+# Виконання готового оператора на переданому з'єднанні або в окремій транзакції бази "core".
+# Повертає список рядків для SELECT або кількість змінених рядків.
+def run_core_statement(name, params=None, conn=None):
+    if conn is None:
+        with registry.engine("core").begin() as conn:
+            return run_core_statement(name, params, conn)
+    result = conn.execute(CORE_STATEMENTS[name], params)
+    return result.all() if result.returns_rows else result.rowcount
+
+def get_students_by_major(major, conn=None):
+    return run_core_statement("students_by_major", {"major": major}, conn)
+
+def get_student(name, conn=None):
+    rows = run_core_statement("student_by_name", {"name": name}, conn)
+    return rows[0] if rows else None
+
+# rows — список словників {"Id", "Name", "Major", "Pass"}; вставка одним executemany
+def add_students(rows, conn=None):
+    run_core_statement("insert_students", rows, conn)
+
+def set_student_pass(name, passed, conn=None):
+    return run_core_statement("set_student_pass", {"name": name, "passed": passed}, conn)
+
+def delete_student(name, conn=None):
+    return run_core_statement("delete_student", {"name": name}, conn)
+
+def add_divisions(rows, conn=None):
+    run_core_statement("insert_divisions", rows, conn)
+
+def add_matches(rows, conn=None):
+    run_core_statement("insert_matches", rows, conn)
+
+def get_matches_with_divisions(conn=None):
+    return run_core_statement("matches_with_divisions", None, conn)
+
+def get_matches_by_division(division, conn=None):
+    return run_core_statement("matches_by_division", {"division": division}, conn)
+
+# Бенчмарк: час виклику готового оператора проти побудови запиту на кожен виклик
+# (з compiled cache двигуна та без нього, тобто з компіляцією SQL щоразу)
+def benchmark_core_statements(calls=5_000):
+    bench_engine = create_engine("sqlite://")
+    metadata.create_all(bench_engine)
+    with bench_engine.begin() as conn:
+        add_students([{"Id": i, "Name": f"Student {i}", "Major": ("Math", "English", "Science")[i % 3], "Pass": True}
+                      for i in range(1, 301)], conn)
+        add_divisions([{"Division": "E1", "Name": "Premier League", "Country": "England"},
+                       {"Division": "D1", "Name": "Bundesliga", "Country": "Germany"}], conn)
+        add_matches([{"Div": ("E1", "D1")[i % 2], "HomeTeam": f"Team {i}", "FTHG": i % 4, "FTAG": i % 3}
+                     for i in range(300)], conn)
+
+    cases = {
+        "get_students_by_major": (
+            lambda conn: get_students_by_major("English", conn),
+            lambda conn: conn.execute(StudentTable.select().where(StudentTable.columns.Major == "English")).all(),
+        ),
+        "set_student_pass": (
+            lambda conn: set_student_pass("Student 7", False, conn),
+            lambda conn: conn.execute(
+                StudentTable.update().values(Pass=False).where(StudentTable.columns.Name == "Student 7")),
+        ),
+        "get_matches_by_division": (
+            lambda conn: get_matches_by_division("E1", conn),
+            lambda conn: conn.execute(matches_with_divisions_query().where(Divisions.c.Division == "E1")).all(),
+        ),
+    }
+
+    def measure(call, execution_options=None):
+        with bench_engine.connect() as conn:
+            if execution_options:
+                conn = conn.execution_options(**execution_options)
+            call(conn)
+            began = time.perf_counter()
+            for _ in range(calls):
+                call(conn)
+            elapsed = time.perf_counter() - began
+            conn.rollback()
+        return elapsed / calls * 1e6
+
+    for label, (prepared, ad_hoc) in cases.items():
+        prepared_us = measure(prepared)
+        ad_hoc_us = measure(ad_hoc)
+        uncached_us = measure(ad_hoc, {"compiled_cache": None})
+        print(f"{label:>24}: готовий {prepared_us:.1f} мкс, побудова щоразу {ad_hoc_us:.1f} мкс, "
+              f"без compiled cache {uncached_us:.1f} мкс")
+    bench_engine.dispose()
+
+# ---------- Приклади роботи з Core ----------
+def core_demo():
+    with registry.engine("core").connect() as conn:
+        # ---------- Вставка записів у таблицю Student ----------
+        # Вставляємо одного студента через insert().values()
+        query = db.insert(StudentTable).values(Id=1, Name="Bob", Major="English", Pass=True)
+        conn.execute(query)
+        conn.commit()
+
+        # Виводимо всі записи таблиці
+        output = conn.execute(StudentTable.select()).fetchall()
+        print(output)
+
+        # Масова вставка декількох записів
+        query = db.insert(StudentTable)
+        values_list = [
+            {"Id": 2, "Name": "Alice", "Major": "Science", "Pass": False},
+            {"Id": 3, "Name": "Ben", "Major": "Math", "Pass": True},
+            {"Id": 4, "Name": "John", "Major": "English", "Pass": False}
+        ]
+        conn.execute(query, values_list)
+        conn.commit()
+        print(conn.execute(StudentTable.select()).fetchall())
+
+        # ---------- CRUD: READ, UPDATE, DELETE для Student ----------
+        # Фільтрація за Major == 'English'
+        query = StudentTable.select().where(StudentTable.columns.Major == "English")
+        print(conn.execute(query).fetchall())
+
+        # Оновлення: позначаємо Pass=True для Alice
+        query = StudentTable.update().values(Pass=True).where(StudentTable.columns.Name == "Alice")
+        conn.execute(query)
+        conn.commit()
+        print(conn.execute(StudentTable.select()).fetchall())
+
+        # Видалення: видаляємо запис Ben
+        query = StudentTable.delete().where(StudentTable.columns.Name == "Ben")
+        conn.execute(query)
+        conn.commit()
+        print(conn.execute(StudentTable.select()).fetchall())
+
+        # ---------- Заповнення таблиць Divisions і Matchs ----------
+        # Вставляємо дані в Divisions
+        conn.execute(db.insert(Divisions), [
+            {'Division': "E1", "Name": "Premier League", "Country": "England"},
+            {'Division': "D1", "Name": "Bundesliga", "Country": "Germany"}
+        ])
+        # Вставляємо дані в Matchs
+        conn.execute(db.insert(Matchs), [
+            {"Div": "E1", "HomeTeam": "Norwich", "FTHG": 1, "FTAG": 1},
+            {"Div": "E1", "HomeTeam": "Liverpool", "FTHG": 2, "FTAG": 1},
+            {"Div": "D1", "HomeTeam": "Bayern", "FTHG": 3, "FTAG": 0}
+        ])
+        conn.commit()
+
+        # Приклад JOIN між Matchs та Divisions
+        result = conn.execute(matches_with_divisions_query()).fetchall()
+        for row in result:
+            print(row)
+
+        # JOIN Matchs та Divisions пачками по 2 рядки
+        for batch in iter_batches(conn, matches_with_divisions_query(), batch_size=2):
+            print(batch)
+
+    # ---------- Готові запити ----------
+    print(get_students_by_major("English"))
+    set_student_pass("John", True)
+    print(get_student("John"))
+    print(get_matches_by_division("E1"))
+
+# ---------- Потоковий імпорт CSV / JSON Lines у Core-таблиці ----------
+# Файл читається лінивo, рядки перевіряються та конвертуються пачками по chunk_size
+# і вставляються через executemany; у пам'яті одночасно лише одна пачка.
+
+# Налаштування SQLite на час масового завантаження; після нього повертаються значення,
+# що були до імпорту (наприклад, WAL конкурентного режиму)
+BULK_LOAD_PRAGMAS = {"journal_mode": "MEMORY", "synchronous": "OFF", "cache_size": "-16384"}
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+
+# Перетворення сирого значення з файлу у тип колонки з перевіркою
+def convert_value(column, raw):
+    if raw is None or raw == "":
+        return None
+    python_type = column.type.python_type
+    if python_type is bool:
+        if isinstance(raw, bool):
+            return raw
+        text = str(raw).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"{column.name}: очікується логічне значення, отримано {raw!r}")
+    value = python_type(raw)
+    length = getattr(column.type, "length", None)
+    if python_type is str and length and len(value) > length:
+        raise ValueError(f"{column.name}: довжина перевищує {length} символів")
+    return value
+
+# Перетворення рядка файлу у словник параметрів для executemany.
+# Усі рядки отримують однаковий набір ключів: пропущені значення замінюються на default колонки.
+def convert_row(table, raw_row):
+    row = {}
+    for column in table.columns:
+        value = convert_value(column, raw_row.get(column.name))
+        if value is None:
+            if column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+            elif not column.nullable and not (column.primary_key and column.autoincrement):
+                raise ValueError(f"{column.name}: обов'язкове значення відсутнє")
+        row[column.name] = value
+    return row
+
+# Лінивe читання рядків файлу як словників.
+# Рядок JSON Lines, що не розбирається або не є об'єктом, повертається як None.
+def read_rows(path, file_format=None):
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+        elif file_format in ("jsonl", "ndjson"):
+            for line in source:
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        row = None
+                    yield row if isinstance(row, dict) else None
+        else:
+            raise ValueError(f"Непідтримуваний формат файлу: {file_format}")
+
+def set_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.exec_driver_sql(f"PRAGMA {name}={value}")
+
+def get_pragmas(connection, names):
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
+# Піковий RSS процесу в МБ або None, якщо модуля resource немає (Windows).
+# ru_maxrss у Linux повертається в кілобайтах, у macOS — в байтах.
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# Імпорт файлу в Core-таблицю (Student, Divisions, Matchs) бази core або іншої бази bind.
+# Фіксує транзакцію кожні commit_every рядків. Невалідні та нерозібрані рядки пропускаються та рахуються.
+# Повертає статистику: рядки, помилки, час, рядків/с, піковий RSS процесу (None, якщо невідомий).
+def import_rows(path, table_name, file_format=None, chunk_size=10_000, commit_every=500_000, bind=None):
+    table = metadata.tables[table_name]
+    bind = bind or registry.engine("core")
+    inserted = errors = pending = 0
+    began = time.perf_counter()
+    rows = read_rows(path, file_format)
+    with bind.connect() as bulk_conn:
+        previous_pragmas = get_pragmas(bulk_conn, BULK_LOAD_PRAGMAS)
+        bulk_conn.commit()
+        set_pragmas(bulk_conn, BULK_LOAD_PRAGMAS)
+        try:
+            while True:
+                raw_chunk = list(islice(rows, chunk_size))
+                if not raw_chunk:
+                    break
+                chunk = []
+                for raw_row in raw_chunk:
+                    if raw_row is None:
+                        errors += 1
+                        continue
+                    try:
+                        chunk.append(convert_row(table, raw_row))
+                    except (ValueError, TypeError):
+                        errors += 1
+                if chunk:
+                    bulk_conn.execute(db.insert(table), chunk)
+                    inserted += len(chunk)
+                    pending += len(chunk)
+                if pending >= commit_every:
+                    bulk_conn.commit()
+                    pending = 0
+            bulk_conn.commit()
+        finally:
+            bulk_conn.rollback()
+            set_pragmas(bulk_conn, previous_pragmas)
+    elapsed = time.perf_counter() - began
+    stats = {
+        "rows": inserted,
+        "errors": errors,
+        "seconds": elapsed,
+        "rows_per_sec": inserted / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    peak = "невідомий" if stats["peak_rss_mb"] is None else f"{stats['peak_rss_mb']:.1f} МБ"
+    print(f"Імпортовано {inserted} рядків у {table_name} ({errors} помилок): "
+          f"{stats['rows_per_sec']:,.0f} рядків/с, піковий RSS {peak}")
+    return stats
+
+# Бенчмарк імпорту архіву матчів: пікова пам'ять не повинна зростати разом з розміром файлу
+def benchmark_import_matches(sizes=(100_000, 1_000_000, 3_000_000)):
+    import random
+
+    divisions = ["E1", "E2", "D1", "SP1", "I1"]
+    teams = [f"Team {i}" for i in range(200)]
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "matches.csv")
+            with open(path, "w", newline="", encoding="utf-8") as target:
+                writer = csv.writer(target)
+                writer.writerow(["Div", "HomeTeam", "FTHG", "FTAG"])
+                for _ in range(size):
+                    writer.writerow([random.choice(divisions), random.choice(teams),
+                                     random.randint(0, 5), random.randint(0, 5)])
+            bench_engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            metadata.create_all(bench_engine)
+            import_rows(path, "Matchs", bind=bench_engine)
+            bench_engine.dispose()
+
+# ---------- Потокове читання результатів запитів ----------
+# Замість fetchall() рядки читаються пачками через yield_per / partitions().
+# executor — Core-з'єднання або ORM-сесія: обидва приймають execution_options.
+
+def execute_streaming(executor, statement, batch_size=1000):
+    return executor.execute(statement, execution_options={"yield_per": batch_size})
+
+# Генератор пачок рядків; scalars=True для ORM-запитів повертає об'єкти моделей замість Row
+def iter_batches(executor, statement, batch_size=1000, scalars=False):
+    result = execute_streaming(executor, statement, batch_size)
+    try:
+        if scalars:
+            result = result.scalars()
+        for batch in result.partitions():
+            yield batch
+    finally:
+        result.close()
+
+# Запис результату запиту у CSV або JSON Lines без накопичення всіх рядків у пам'яті.
+# Запит має вибирати колонки (Core select або атрибути моделей), а не цілі ORM-об'єкти.
+def export_query(executor, statement, path, file_format=None, batch_size=1000):
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if file_format not in ("csv", "jsonl", "ndjson"):
+        raise ValueError(f"Непідтримуваний формат файлу: {file_format}")
+    result = execute_streaming(executor, statement, batch_size)
+    written = 0
+    try:
+        keys = list(result.keys())
+        with open(path, "w", newline="", encoding="utf-8") as target:
+            writer = csv.writer(target) if file_format == "csv" else None
+            if writer:
+                writer.writerow(keys)
+            for batch in result.partitions():
+                if writer:
+                    writer.writerows(batch)
+                else:
+                    target.writelines(
+                        json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=str) + "\n" for row in batch
+                    )
+                written += len(batch)
+    finally:
+        result.close()
+    print(f"Експортовано {written} рядків у {path}")
+    return written
 
 # ---------- ORM: приклад з користувачем User ----------
-Base = declarative_base()
+UserBase = declarative_base()
 
-class User(Base):
+class User(UserBase):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True)  # Унікальний ідентифікатор
     username = Column(String)              # Ім'я користувача
@@ -118,204 +735,967 @@ class User(Base):
         return f"<User(id={self.id}, username={self.username}, email={self.email})>"
 
 # Використовуємо окремий файл БД для ORM прикладу
-enorm = create_engine("sqlite:///example.db", echo=False)
-Base.metadata.create_all(enorm)
-Session = sessionmaker(bind=enorm)
-session = Session()
-
-# Додаємо нового користувача
-new_user = User(username="JohnDoe", email="john@example.com")
-session.add(new_user)
-session.commit()
-# Читаємо та оновлюємо користувача
-user = session.query(User).filter_by(username="JohnDoe").first()
-print(f"Знайдено користувача: {user}")
-user.email = "john.doe@example.com"
-session.commit()
-user = session.query(User).filter_by(username="JohnDoe").first()
-print(f"Оновлено користувача: {user}")
-# Видаляємо користувача
-session.delete(user)
-session.commit()
-user = session.query(User).filter_by(username="JohnDoe").first()
-print(f"Після видалення: {user}")
+registry.configure("users", "sqlite:///example.db", UserBase.metadata)
+
+def users_demo():
+    session = registry.session("users")
+    # Додаємо нового користувача
+    new_user = User(username="JohnDoe", email="john@example.com")
+    session.add(new_user)
+    session.commit()
+    # Читаємо та оновлюємо користувача
+    user = session.query(User).filter_by(username="JohnDoe").first()
+    print(f"Знайдено користувача: {user}")
+    user.email = "john.doe@example.com"
+    session.commit()
+    user = session.query(User).filter_by(username="JohnDoe").first()
+    print(f"Оновлено користувача: {user}")
+    # Видаляємо користувача
+    session.delete(user)
+    session.commit()
+    user = session.query(User).filter_by(username="JohnDoe").first()
+    print(f"Після видалення: {user}")
 
 # ---------- ORM: ресторанні столики та бронювання ----------
-Base = declarative_base()
+RestaurantBase = declarative_base()
 
-class Table(Base):
+class Table(RestaurantBase):
     __tablename__ = "tables"
     id = Column(Integer, primary_key=True)
-    seats = Column(Integer, nullable=False)  # Кількість місць за столом
+    seats = Column(Integer, nullable=False, index=True)  # Кількість місць за столом
     reservations = relationship("Reservation", back_populates="table")
 
-class Reservation(Base):
+# Максимальна тривалість одного бронювання (в хвилинах).
+# Обмежує діапазон, який переглядається в індексі (table_id, reserved_at) під час пошуку.
+MAX_RESERVATION_MINUTES = 6 * 60
+
+class Reservation(RestaurantBase):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Композитний індекс для перевірки зайнятості конкретного столика в проміжку часу
+        db.Index("ix_reservations_table_id_reserved_at", "table_id", "reserved_at"),
+        # AUTOINCREMENT: id не використовуються повторно, коли архівація (archive.py) спорожнює таблицю,
+        # тож id в робочій таблиці та в архівах не збігаються
+        {"sqlite_autoincrement": True},
+    )
     id = Column(Integer, primary_key=True)
     table_id = Column(Integer, ForeignKey('tables.id'))
-    reserved_at = Column(DateTime, nullable=False)  # Час бронювання
+    reserved_at = Column(DateTime, nullable=False, index=True)  # Час бронювання (індекс — для вибірок за днями)
     duration_minutes = Column(Integer, default=60) # Тривалість бронювання в хвилинах
     table = relationship("Table", back_populates="reservations")
 
-engine = create_engine("sqlite:///restaurant.db")
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
+# timeout — скільки секунд бронювання чекає, поки інший потік чи процес завершить своє
+registry.configure("restaurant", "sqlite:///restaurant.db", RestaurantBase.metadata, connect_args={"timeout": 30})
 
-# Функція додавання столика
-def add_table(seats):
-    table = Table(seats=seats)
-    session.add(table)
-    session.commit()
+# Функція додавання столика; database — ім'я бази в реєстрі (для шардів ресторанів)
+def add_table(seats, database="restaurant"):
+    with registry.unit_of_work(database) as session:
+        session.add(Table(seats=seats))
     print(f"Додано столик на {seats} місць")
 
-# Функція бронювання столика
-def book_table(requested_seats, desired_time):
-    tables = session.query(Table).filter(Table.seats >= requested_seats)
-    for table in tables:
-        # Перевіряємо наявні бронювання
-        reservations = session.query(Reservation).filter_by(table_id=table.id).all()
-        conflict = False
-        for res in reservations:
-            res_start = res.reserved_at
-            res_end = res.reserved_at + timedelta(minutes=res.duration_minutes)
-            desired_end = desired_time + timedelta(minutes=60)
-            # Перевірка перекриття інтервалів
-            if not (desired_end <= res_start or desired_time >= res_end):
-                conflict = True
-                break
-        if not conflict:
-            reservation = Reservation(table=table, reserved_at=desired_time, duration_minutes=60)
-            session.add(reservation)
-            session.commit()
-            print(f"Заброньвано столик #{table.id} на {desired_time.strftime('%d.%m.%Y %H:%M')}")
-            return
-    print("Немає вільних столиків на цей час")
+# Запит усіх вільних столиків з >= :requested_seats місць на [:desired_time, :desired_end)
+# Один SQL-запит з NOT EXISTS замість окремого запиту бронювань для кожного столика.
+# Будується один раз з bindparam, як і CORE_STATEMENTS: бронювання не платить за побудову запиту.
+def build_free_tables_query():
+    desired_time = db.bindparam("desired_time", type_=DateTime)
+    # Бронювання столика, що перекривається з бажаним інтервалом.
+    # Нижня межа reserved_at дозволяє SQLite прочитати лише невеликий діапазон індексу.
+    overlapping = (
+        db.select(Reservation.id)
+        .where(
+            Reservation.table_id == Table.id,
+            Reservation.reserved_at < db.bindparam("desired_end", type_=DateTime),
+            Reservation.reserved_at > db.bindparam("window_start", type_=DateTime),
+            # Порівнюємо в цілих секундах, щоб уникнути похибок float на межах інтервалів
+            db.cast(db.func.strftime("%s", Reservation.reserved_at), Integer) + Reservation.duration_minutes * 60
+            > db.cast(db.func.strftime("%s", desired_time), Integer),
+        )
+        .exists()
+    )
+    return (
+        db.select(Table)
+        .where(Table.seats >= db.bindparam("requested_seats"), ~overlapping)
+        .order_by(Table.id)
+    )
+
+FREE_TABLES_QUERY = build_free_tables_query()
+FIRST_FREE_TABLE_QUERY = FREE_TABLES_QUERY.limit(1)
+
+def free_tables_params(requested_seats, desired_time, duration_minutes=60):
+    return {
+        "requested_seats": requested_seats,
+        "desired_time": desired_time,
+        "desired_end": desired_time + timedelta(minutes=duration_minutes),
+        "window_start": desired_time - timedelta(minutes=MAX_RESERVATION_MINUTES),
+    }
+
+# Запит вільних столиків з підставленими значеннями (для звітів та перевірок)
+def free_tables_query(requested_seats, desired_time, duration_minutes=60):
+    return FREE_TABLES_QUERY.params(free_tables_params(requested_seats, desired_time, duration_minutes))
+
+# Пошук першого вільного столика (з найменшим id)
+def find_free_table(session, requested_seats, desired_time, duration_minutes=60):
+    params = free_tables_params(requested_seats, desired_time, duration_minutes)
+    return session.scalars(FIRST_FREE_TABLE_QUERY, params).first()
+
+# Функція бронювання столика.
+# Пошук і вставка виконуються в одній транзакції з BEGIN IMMEDIATE, тож паралельні
+# бронювання з інших потоків і процесів не можуть зайняти той самий столик на той самий час.
+def book_table(requested_seats, desired_time, duration_minutes=60, database="restaurant"):
+    if not 0 < duration_minutes <= MAX_RESERVATION_MINUTES:
+        raise ValueError(f"Тривалість бронювання має бути від 1 до {MAX_RESERVATION_MINUTES} хвилин")
+    with registry.unit_of_work(database, immediate=True) as session:
+        table = find_free_table(session, requested_seats, desired_time, duration_minutes)
+        if table is None:
+            print("Немає вільних столиків на цей час")
+            return None
+        reservation = Reservation(table=table, reserved_at=desired_time, duration_minutes=duration_minutes)
+        session.add(reservation)
+    print(f"Заброньвано столик #{table.id} на {desired_time.strftime('%d.%m.%Y %H:%M')}")
+    return reservation
+
+# Масове бронювання: requests — список (seats, desired_time, duration_minutes).
+# Конфлікти між запитами та з наявними бронюваннями вирішуються в пам'яті,
+# усі прийняті бронювання записуються однією транзакцією через executemany.
+# Повертає список: id заброньованого столика або None для кожного запиту.
+def book_tables_bulk(requests, db_session=None):
+    db_session = db_session or registry.session("restaurant")
+    requests = list(requests)
+    if not requests:
+        return []
+    for _, _, duration_minutes in requests:
+        if not 0 < duration_minutes <= MAX_RESERVATION_MINUTES:
+            raise ValueError(f"Тривалість бронювання має бути від 1 до {MAX_RESERVATION_MINUTES} хвилин")
+
+    # При будь-якій помилці транзакція відкочується, інакше блокування на запис
+    # лишилося б на з'єднанні сесії потоку й інші записувачі отримували б "database is locked"
+    try:
+        begin_immediate(db_session)
+        tables = db_session.execute(db.select(Table.id, Table.seats).order_by(Table.id)).all()
+        # Для кожного столика — відсортовані початки бронювань і відповідні кінці
+        starts = {table_id: [] for table_id, _ in tables}
+        ends = {table_id: [] for table_id, _ in tables}
+        window_start = min(t for _, t, _ in requests) - timedelta(minutes=MAX_RESERVATION_MINUTES)
+        window_end = max(t + timedelta(minutes=d) for _, t, d in requests)
+        existing = db_session.execute(
+            db.select(Reservation.table_id, Reservation.reserved_at, Reservation.duration_minutes)
+            .where(Reservation.reserved_at > window_start, Reservation.reserved_at < window_end)
+        )
+
+        def occupy(table_id, start, end):
+            index = bisect_left(starts[table_id], start)
+            starts[table_id].insert(index, start)
+            ends[table_id].insert(index, end)
+
+        def is_free(table_id, start, end):
+            table_starts = starts[table_id]
+            # Перекриватися можуть лише бронювання, що почались не раніше ніж за MAX_RESERVATION_MINUTES
+            index = bisect_left(table_starts, end) - 1
+            lower = start - timedelta(minutes=MAX_RESERVATION_MINUTES)
+            while index >= 0 and table_starts[index] > lower:
+                if ends[table_id][index] > start:
+                    return False
+                index -= 1
+            return True
+
+        for table_id, reserved_at, duration_minutes in existing:
+            if table_id in starts:
+                occupy(table_id, reserved_at, reserved_at + timedelta(minutes=duration_minutes))
+
+        outcomes = []
+        rows = []
+        for requested_seats, desired_time, duration_minutes in requests:
+            desired_end = desired_time + timedelta(minutes=duration_minutes)
+            booked = None
+            for table_id, seats in tables:
+                if seats >= requested_seats and is_free(table_id, desired_time, desired_end):
+                    occupy(table_id, desired_time, desired_end)
+                    rows.append({"table_id": table_id, "reserved_at": desired_time,
+                                 "duration_minutes": duration_minutes})
+                    booked = table_id
+                    break
+            outcomes.append(booked)
+
+        if rows:
+            db_session.execute(db.insert(Reservation), rows)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    print(f"Заброньовано {len(rows)} з {len(requests)} запитів")
+    return outcomes
+
+# Бенчмарк: масове бронювання проти бронювання по одному (з commit на кожен запит)
+def benchmark_book_tables_bulk(count=2_000, tables_count=50):
+    import random
+
+    start = datetime(2025, 4, 18, 17, 0)
+    table_seats = [{"seats": random.randint(2, 8)} for _ in range(tables_count)]
+    requests = [
+        (random.randint(2, 6), start + timedelta(minutes=15 * random.randrange(24)), random.choice((60, 90, 120)))
+        for _ in range(count)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for mode in ("one_by_one", "bulk"):
+            bench_engine = create_engine(f"sqlite:///{os.path.join(tmp, mode + '.db')}")
+            Table.metadata.create_all(bench_engine)
+            with Session(bind=bench_engine) as bench_session:
+                bench_session.execute(db.insert(Table), table_seats)
+                bench_session.commit()
+                began = time.perf_counter()
+                if mode == "bulk":
+                    outcomes = book_tables_bulk(requests, bench_session)
+                else:
+                    outcomes = []
+                    for requested_seats, desired_time, duration_minutes in requests:
+                        table = find_free_table(bench_session, requested_seats, desired_time, duration_minutes)
+                        if table is not None:
+                            bench_session.add(Reservation(
+                                table_id=table.id, reserved_at=desired_time, duration_minutes=duration_minutes
+                            ))
+                            bench_session.commit()
+                        outcomes.append(table.id if table is not None else None)
+                elapsed = time.perf_counter() - began
+            bench_engine.dispose()
+            results[mode] = outcomes
+            print(f"{mode:>10}: {count / elapsed:,.0f} запитів/с ({elapsed:.2f} с)")
+        print("Результати збігаються:", results["bulk"] == results["one_by_one"])
+
+# Бенчмарк: час пошуку вільного столика при зростанні кількості бронювань
+def benchmark_book_table(sizes=(1_000, 10_000, 100_000, 1_000_000), tables_count=200, lookups=200):
+    import random
+
+    start = datetime(2025, 1, 1, 12, 0)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            bench_engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Table.metadata.create_all(bench_engine)
+            with Session(bind=bench_engine) as bench_session:
+                bench_session.execute(
+                    db.insert(Table),
+                    [{"seats": random.randint(2, 8)} for _ in range(tables_count)],
+                )
+                # Кожен столик зайнятий по годині кожні дві години
+                rows = []
+                for i in range(size):
+                    rows.append({
+                        "table_id": i % tables_count + 1,
+                        "reserved_at": start + timedelta(hours=2 * (i // tables_count)),
+                        "duration_minutes": 60,
+                    })
+                    if len(rows) == 50_000:
+                        bench_session.execute(db.insert(Reservation), rows)
+                        rows = []
+                if rows:
+                    bench_session.execute(db.insert(Reservation), rows)
+                bench_session.commit()
+
+                span_hours = 2 * (size // tables_count + 1)
+                moments = [start + timedelta(minutes=random.randrange(span_hours * 60)) for _ in range(lookups)]
+                began = time.perf_counter()
+                for moment in moments:
+                    find_free_table(bench_session, random.randint(2, 8), moment)
+                elapsed = time.perf_counter() - began
+            bench_engine.dispose()
+        print(f"{size:>9} бронювань: {elapsed / lookups * 1000:.3f} мс на пошук столика")
+
+# Подвійні бронювання: пари бронювань одного столика з перекриттям у часі
+def find_double_bookings(db_session):
+    rows = db_session.execute(
+        db.select(Reservation.table_id, Reservation.reserved_at, Reservation.duration_minutes)
+        .order_by(Reservation.table_id, Reservation.reserved_at)
+    ).all()
+    doubles = []
+    latest_end = {}
+    for table_id, reserved_at, duration_minutes in rows:
+        if table_id in latest_end and latest_end[table_id] > reserved_at:
+            doubles.append((table_id, reserved_at))
+        end = reserved_at + timedelta(minutes=duration_minutes)
+        latest_end[table_id] = max(latest_end.get(table_id, end), end)
+    return doubles
+
+# Стрес-тест: threads потоків одночасно бронюють столики на невелику кількість слотів.
+# "без блокування" — перевірка та вставка в звичайній транзакції (як було раніше),
+# "BEGIN IMMEDIATE" — book_table. Для кожного режиму рахуються бронювання/с та подвійні бронювання.
+def stress_book_table(threads=8, requests_per_thread=150, tables_count=20, slots=48):
+    import io
+    import random
+    from contextlib import redirect_stdout
 
-# Приклади викликів функцій бронювання\add_table(2)
-add_table(4)
-book_table(2, datetime(2025, 4, 17, 18, 0))
-book_table(2, datetime(2025, 4, 17, 18, 0))
-book_table(2, datetime(2025, 4, 17, 18, 0))
-book_table(2, datetime(2025, 4, 17, 19, 0))
-book_table(4, datetime(2025, 4, 17, 19, 0))
+    start = datetime(2025, 4, 18, 17, 0)
+
+    def unsafe_book_table(requested_seats, desired_time, duration_minutes=60):
+        with registry.unit_of_work("restaurant") as session:
+            table = find_free_table(session, requested_seats, desired_time, duration_minutes)
+            if table is not None:
+                session.add(Reservation(table=table, reserved_at=desired_time, duration_minutes=duration_minutes))
+        return table
+
+    results = {}
+    for label, book in (("без блокування", unsafe_book_table), ("BEGIN IMMEDIATE", book_table)):
+        with registry.temporary("restaurant"):
+            with registry.unit_of_work("restaurant") as session:
+                session.execute(db.insert(Table), [{"seats": 4} for _ in range(tables_count)])
+            booked = []
+            errors = []
+            barrier = threading.Barrier(threads)
+
+            def worker():
+                rng = random.Random()
+                barrier.wait()
+                try:
+                    for _ in range(requests_per_thread):
+                        desired_time = start + timedelta(minutes=30 * rng.randrange(slots))
+                        if book(2, desired_time, 60) is not None:
+                            booked.append(desired_time)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    registry.remove("restaurant")
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            with redirect_stdout(io.StringIO()):
+                began = time.perf_counter()
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+                elapsed = time.perf_counter() - began
+            with registry.reading("restaurant") as session:
+                doubles = find_double_bookings(session)
+            results[label] = len(doubles)
+            print(f"{label:>16}: {threads * requests_per_thread / elapsed:,.0f} запитів/с, "
+                  f"заброньовано {len(booked)}, подвійних бронювань {len(doubles)}, помилок {len(errors)}")
+    return results["BEGIN IMMEDIATE"] == 0
+
+# Приклади викликів функцій бронювання
+def restaurant_demo():
+    # add_table(2)
+    add_table(4)
+    book_table(2, datetime(2025, 4, 17, 18, 0))
+    book_table(2, datetime(2025, 4, 17, 18, 0))
+    book_table(2, datetime(2025, 4, 17, 18, 0))
+    book_table(2, datetime(2025, 4, 17, 19, 0))
+    book_table(4, datetime(2025, 4, 17, 19, 0))
 
 # ---------- ORM: школа — студенти, предмети, оцінки ----------
-Base = declarative_base()
+SchoolBase = declarative_base()
 
-class Student(Base):
+class Student(SchoolBase):
     __tablename__ = "students"
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)   # Ім'я студента
+    name = Column(String, nullable=False, unique=True)   # Ім'я студента (унікальний індекс)
     group = Column(String, nullable=False)  # Група студента
     grades = relationship("Grade", back_populates="student")
 
-class Subject(Base):
+class Subject(SchoolBase):
     __tablename__ = "subjects"
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)   # Назва предмету
+    name = Column(String, nullable=False, unique=True)   # Назва предмету (унікальний індекс)
     grades = relationship("Grade", back_populates="subject")
 
-class Grade(Base):
+class Grade(SchoolBase):
     __tablename__ = "grades"
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey("students.id"))
-    subject_id = Column(Integer, ForeignKey("subjects.id"))
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), index=True)
     value = Column(db.Float, nullable=False)  # Оцінка студента
     student = relationship("Student", back_populates="grades")
     subject = relationship("Subject", back_populates="grades")
 
-# Підключення до school.db та створення таблиць
-engine = create_engine("sqlite:///school.db")
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
+# Агреговані оцінки студента, що оновлюються разом з кожною новою оцінкою
+class StudentStats(SchoolBase):
+    __tablename__ = "student_stats"
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    grades_count = Column(Integer, nullable=False, default=0)
+    grades_sum = Column(db.Float, nullable=False, default=0)
+    average = Column(db.Float, index=True)  # Індекс для швидкого пошуку відмінників
+
+# Агреговані оцінки з предмету
+class SubjectStats(SchoolBase):
+    __tablename__ = "subject_stats"
+    subject_id = Column(Integer, ForeignKey("subjects.id"), primary_key=True)
+    grades_count = Column(Integer, nullable=False, default=0)
+    grades_sum = Column(db.Float, nullable=False, default=0)
+    average = Column(db.Float)
+
+# Підключення до school.db (таблиці створюються при першому зверненні)
+registry.configure("school", "sqlite:///school.db", SchoolBase.metadata)
+
+# Обмежений LRU-кеш відповідностей (модель, ім'я) -> id.
+# Зберігається в session.info, тому живе не довше за сесію; generation — покоління NameChanges,
+# для якого кеш заповнено.
+class NameCache:
+    def __init__(self, maxsize=100_000, generation=0):
+        self.maxsize = maxsize
+        self.generation = generation
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+NAME_CACHE_KEY = "name_cache"
+
+# Зміни студентів і предметів для кешів імен сесій (підписник SessionChangeTracker).
+# SQLite не перевіряє зовнішніх ключів, тож застарілий id дав би оцінки неіснуючому студенту:
+# кеш сесії відкидається при її rollback (id могли належати відкоченим рядкам) і одразу після flush,
+# що видалив чи перейменував студента або предмет; після commit такої сесії покоління збільшується,
+# і кеші інших сесій відкидаються при наступному зверненні.
+class NameChanges:
+    def __init__(self, name="school"):
+        self.engine = None
+        self._generations = itertools.count(1)
+        self.generation = 0
+        self._changes = change_tracker(name)
+        self._changes.subscribe(self)
+        registry.listen_sessions(name, "after_soft_rollback", self._after_rollback)
+
+    def sync(self):
+        self._changes.sync(self)
+
+    def reset(self, engine):
+        self.engine = engine
+        self.generation = next(self._generations)
+
+    def collect_flush(self, session, pending):
+        for obj in (*session.deleted, *session.dirty):
+            if isinstance(obj, (Student, Subject)) and (
+                    obj in session.deleted or db.inspect(obj).attrs.name.history.deleted):
+                pending.append((obj.__tablename__, obj.id))
+                session.info.pop(NAME_CACHE_KEY, None)
+
+    def collect_execute(self, orm_execute_state, pending):
+        if (not orm_execute_state.is_insert
+                and SessionChangeTracker.table_name(orm_execute_state) in (Student.__tablename__, Subject.__tablename__)):
+            pending.append(("all", None))
+            orm_execute_state.session.info.pop(NAME_CACHE_KEY, None)
+
+    def apply_changes(self, pending):
+        self.generation = next(self._generations)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(NAME_CACHE_KEY, None)
+
+name_changes = NameChanges()
+
+def name_cache(db_session):
+    name_changes.sync()
+    cache = db_session.info.get(NAME_CACHE_KEY)
+    if cache is None or cache.generation != name_changes.generation:
+        cache = db_session.info[NAME_CACHE_KEY] = NameCache(generation=name_changes.generation)
+    return cache
+
+# Перетворення імен у id: спочатку кеш, решта — одним запитом WHERE name IN (...)
+def resolve_ids(db_session, model, names):
+    cache = name_cache(db_session)
+    resolved = {}
+    missing = []
+    for name in set(names):
+        cached = cache.get((model.__tablename__, name))
+        if cached is None:
+            missing.append(name)
+        else:
+            resolved[name] = cached
+    if missing:
+        for item_id, name in db_session.execute(db.select(model.id, model.name).where(model.name.in_(missing))):
+            cache.put((model.__tablename__, name), item_id)
+            resolved[name] = item_id
+    return resolved
 
 # Функція додавання студента
 def add_student(name, group):
-    student = Student(name=name, group=group)
-    session.add(student)
-    session.commit()
+    try:
+        with registry.unit_of_work("school") as session:
+            session.add(Student(name=name, group=group))
+    except db.exc.IntegrityError:
+        print(f"Студент {name} вже існує")
+        return
     print(f"Додано студента {name} до групи {group}")
 
 # Функція додавання предмету
 def add_subject(name):
-    subject = Subject(name=name)
-    session.add(subject)
-    session.commit()
+    try:
+        with registry.unit_of_work("school") as session:
+            session.add(Subject(name=name))
+    except db.exc.IntegrityError:
+        print(f"Предмет {name} вже існує")
+        return
     print(f"Додано предмет {name}")
 
 # Функція виставлення оцінки
 
 def give_grade(student_name, subject_name, value):
-    student = session.query(Student).filter_by(name=student_name).first()
-    subject = session.query(Subject).filter_by(name=subject_name).first()
-    if not student or not subject:
-        print("Студент або предмет не знайдені")
-        return
-    grade = Grade(student=student, subject=subject, value=value)
-    session.add(grade)
-    session.commit()
+    with registry.unit_of_work("school") as session:
+        student_id = resolve_ids(session, Student, [student_name]).get(student_name)
+        subject_id = resolve_ids(session, Subject, [subject_name]).get(subject_name)
+        if student_id is None or subject_id is None:
+            print("Студент або предмет не знайдені")
+            return
+        session.add(Grade(student_id=student_id, subject_id=subject_id, value=value))
+        # Агрегати оновлюються в тій самій транзакції, що й вставка оцінки
+        update_grade_stats(session, {student_id: (1, value)}, {subject_id: (1, value)})
     print(f"Виставлено оцінку {value} студенту {student_name} з предмету {subject_name}")
 
+# Масове виставлення оцінок: rows — ітерабельне (student_name, subject_name, value).
+# Імена розв'язуються через кеш сесії, оцінки вставляються пачками по chunk_size,
+# кожна пачка разом з агрегатами фіксується однією транзакцією.
+# Повертає (кількість вставлених, кількість пропущених) оцінок.
+def give_grades_bulk(rows, chunk_size=10_000):
+    session = registry.session("school")
+    inserted = skipped = 0
+    chunk = []
+
+    def flush(chunk):
+        student_ids = resolve_ids(session, Student, [row[0] for row in chunk])
+        subject_ids = resolve_ids(session, Subject, [row[1] for row in chunk])
+        values = []
+        student_totals = {}
+        subject_totals = {}
+        for student_name, subject_name, value in chunk:
+            student_id = student_ids.get(student_name)
+            subject_id = subject_ids.get(subject_name)
+            if student_id is None or subject_id is None:
+                continue
+            values.append({"student_id": student_id, "subject_id": subject_id, "value": value})
+            count, total = student_totals.get(student_id, (0, 0))
+            student_totals[student_id] = (count + 1, total + value)
+            count, total = subject_totals.get(subject_id, (0, 0))
+            subject_totals[subject_id] = (count + 1, total + value)
+        if values:
+            # Core-вставка таблиці напряму: без накладних витрат ORM bulk insert на кожен рядок
+            session.execute(db.insert(Grade.__table__), values)
+            update_grade_stats(session, student_totals, subject_totals)
+        session.commit()
+        return len(values)
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            done = flush(chunk)
+            inserted += done
+            skipped += len(chunk) - done
+            chunk = []
+    if chunk:
+        done = flush(chunk)
+        inserted += done
+        skipped += len(chunk) - done
+    print(f"Виставлено {inserted} оцінок, пропущено {skipped}")
+    return inserted, skipped
+
+# Атомарне оновлення агрегатів: INSERT ... ON CONFLICT DO UPDATE без читання поточних значень.
+# Оператор будується один раз для кожної таблиці агрегатів і далі лише отримує параметри.
+GRADE_STATS_UPSERTS = {}
+
+def grade_stats_upsert(model, key):
+    stmt = GRADE_STATS_UPSERTS.get(key)
+    if stmt is None:
+        table = model.__table__
+        stmt = sqlite_insert(table).values({
+            key: db.bindparam("key_value"),
+            "grades_count": db.bindparam("count"),
+            "grades_sum": db.bindparam("total"),
+            "average": db.bindparam("average"),
+        })
+        stmt = GRADE_STATS_UPSERTS[key] = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={
+                "grades_count": table.c.grades_count + stmt.excluded.grades_count,
+                "grades_sum": table.c.grades_sum + stmt.excluded.grades_sum,
+                "average": (table.c.grades_sum + stmt.excluded.grades_sum)
+                / (table.c.grades_count + stmt.excluded.grades_count),
+            },
+        )
+    return stmt
+
+# student_totals / subject_totals — словники id -> (кількість нових оцінок, їх сума);
+# для кожної таблиці виконується один executemany.
+def update_grade_stats(db_session, student_totals, subject_totals):
+    for model, key, totals in (
+        (StudentStats, "student_id", student_totals),
+        (SubjectStats, "subject_id", subject_totals),
+    ):
+        if not totals:
+            continue
+        db_session.execute(grade_stats_upsert(model, key), [
+            {"key_value": key_value, "count": count, "total": total, "average": total / count}
+            for key_value, (count, total) in totals.items()
+        ])
+
+GRADE_STATS_KEYS = ((StudentStats, Grade.student_id), (SubjectStats, Grade.subject_id))
+
+# INSERT ... SELECT агрегатів таблиці model з усієї таблиці grades
+def grade_stats_from_grades(model, key):
+    return db.insert(model).from_select(
+        [model.__table__.primary_key.columns[0].name, "grades_count", "grades_sum", "average"],
+        db.select(key, db.func.count(Grade.id), db.func.sum(Grade.value), db.func.avg(Grade.value))
+        .group_by(key),
+    )
+
+# Повний перерахунок агрегатів з таблиці grades (наприклад, після ручних змін у базі)
+def rebuild_grade_stats():
+    with registry.unit_of_work("school") as session:
+        for model, key in GRADE_STATS_KEYS:
+            session.execute(db.delete(model))
+            session.execute(grade_stats_from_grades(model, key))
+    print("Агрегати оцінок перераховано")
+
+# Таблиця агрегатів щойно створена в наявній school.db, де оцінки вже є:
+# заповнюємо її одразу, інакше звіти показували б "оцінки не знайдені" до ручного rebuild_grade_stats
+def fill_new_grade_stats(model, key):
+    def fill(target, connection, **kw):
+        # У новій базі grades може створюватися пізніше — тоді оцінок ще немає
+        if db.inspect(connection).has_table(Grade.__tablename__):
+            connection.execute(grade_stats_from_grades(model, key))
+    db.event.listen(model.__table__, "after_create", fill)
+
+fill_new_grade_stats(StudentStats, Grade.student_id)
+fill_new_grade_stats(SubjectStats, Grade.subject_id)
+
+# Перевірка узгодженості агрегатів з таблицею grades.
+# Повертає список розбіжностей (порожній, якщо все узгоджено).
+def check_grade_stats():
+    mismatches = []
+    with registry.reading("school") as session:
+        for model, key in GRADE_STATS_KEYS:
+            stats_key = model.__table__.primary_key.columns[0]
+            actual = db.select(
+                key.label("id"),
+                db.func.count(Grade.id).label("grades_count"),
+                db.func.sum(Grade.value).label("grades_sum"),
+            ).group_by(key).subquery()
+            # FULL OUTER JOIN емулюємо двома LEFT JOIN: зайві агрегати та відсутні агрегати
+            stored = session.execute(
+                db.select(stats_key, model.grades_count, model.grades_sum, actual.c.grades_count, actual.c.grades_sum)
+                .outerjoin(actual, actual.c.id == stats_key)
+            )
+            for key_value, count, total, actual_count, actual_total in stored:
+                if count != (actual_count or 0) or abs(total - (actual_total or 0)) > 1e-9:
+                    mismatches.append({
+                        "table": model.__tablename__, "id": key_value,
+                        "stored": (count, total), "actual": (actual_count or 0, actual_total or 0),
+                    })
+            missing = session.execute(
+                db.select(actual.c.id, actual.c.grades_count, actual.c.grades_sum)
+                .outerjoin(model, stats_key == actual.c.id)
+                .where(stats_key.is_(None))
+            )
+            for key_value, actual_count, actual_total in missing:
+                mismatches.append({
+                    "table": model.__tablename__, "id": key_value,
+                    "stored": None, "actual": (actual_count, actual_total),
+                })
+    if mismatches:
+        print(f"Знайдено {len(mismatches)} розбіжностей в агрегатах оцінок")
+    else:
+        print("Агрегати оцінок узгоджені")
+    return mismatches
+
+# ---------- Профілі завантаження зв'язків Student.grades -> Grade.subject ----------
+# Зв'язки моделей лишаються ледачими, а стратегія обирається в кожному місці виклику:
+#   "selectin" — окремий SELECT ... WHERE id IN (...) на кожен рівень зв'язків;
+#   "joined"   — один запит з LEFT OUTER JOIN;
+#   "raise"    — будь-яке незавантажене звернення до зв'язку викликає помилку (перевірка на N+1);
+#   "lazy"     — стандартне ледаче завантаження (по запиту на кожного студента).
+DEFAULT_LOADING = "selectin"
+
+def grade_loader_options(loading=DEFAULT_LOADING):
+    if loading == "selectin":
+        return [selectinload(Student.grades).selectinload(Grade.subject)]
+    if loading == "joined":
+        return [joinedload(Student.grades).joinedload(Grade.subject)]
+    if loading == "raise":
+        return [raiseload("*")]
+    if loading == "lazy":
+        return []
+    raise ValueError(f"Невідомий профіль завантаження: {loading}")
+
+def grade_details(student):
+    return [{"subject": grade.subject.name, "value": grade.value} for grade in student.grades]
+
 # Функція обчислення середнього бала студента
+# Читає готовий агрегат з student_stats; as_dicts=True повертає список словників замість виводу,
+# with_grades=True додає до кожного словника оцінки, завантажені за профілем loading
 
-def student_average(name):
-    student = session.query(Student).filter_by(name=name).first()
-    if not student:
+def student_average(name, as_dicts=False, with_grades=False, loading=DEFAULT_LOADING):
+    query = (
+        db.select(Student, StudentStats.average, StudentStats.grades_count)
+        .outerjoin(StudentStats, StudentStats.student_id == Student.id)
+        .where(Student.name == name)
+        .order_by(Student.id)
+    )
+    if with_grades:
+        query = query.options(*grade_loader_options(loading))
+    with registry.reading("school") as session:
+        rows = [
+            {"id": student.id, "name": student.name, "average": avg, "grades_count": count or 0,
+             **({"grades": grade_details(student)} if with_grades else {})}
+            for student, avg, count in session.execute(query).unique()
+        ]
+    if as_dicts:
+        return rows
+    if not rows:
         print("Студента не знайдено")
         return
-    grades = [g.value for g in student.grades]
-    if grades:
-        avg = sum(grades) / len(grades)
-        print(f"Середній бал {name}: {avg:.2f}")
-    else:
-        print(f"Оцінки для {name} не знайдені")
+    for row in rows:
+        if row["grades_count"]:
+            print(f"Середній бал {name}: {row['average']:.2f}")
+        else:
+            print(f"Оцінки для {name} не знайдені")
 
 # Функція обчислення середнього бала з предмету
 
-def subject_average(name):
-    subject = session.query(Subject).filter_by(name=name).first()
-    if not subject:
+def subject_average(name, as_dicts=False):
+    query = (
+        db.select(Subject.id, Subject.name, SubjectStats.average, SubjectStats.grades_count)
+        .outerjoin(SubjectStats, SubjectStats.subject_id == Subject.id)
+        .where(Subject.name == name)
+        .order_by(Subject.id)
+    )
+    with registry.reading("school") as session:
+        rows = [
+            {"id": subject_id, "name": subject_name, "average": avg, "grades_count": count or 0}
+            for subject_id, subject_name, avg, count in session.execute(query)
+        ]
+    if as_dicts:
+        return rows
+    if not rows:
         print("Предмет не знайдено")
         return
-    grades = [g.value for g in subject.grades]
-    if grades:
-        avg = sum(grades) / len(grades)
-        print(f"Середній бал з {name}: {avg:.2f}")
-    else:
-        print(f"Оцінки з {name} не знайдені")
+    for row in rows:
+        if row["grades_count"]:
+            print(f"Середній бал з {name}: {row['average']:.2f}")
+        else:
+            print(f"Оцінки з {name} не знайдені")
 
 # Функція виведення студентів з відзнакою
+# Пошук по індексу student_stats.average замість агрегації всієї таблиці grades
+
+def list_honors(threshold=90, as_dicts=False, with_grades=False, loading=DEFAULT_LOADING):
+    query = (
+        db.select(Student, StudentStats.average)
+        .join(StudentStats, StudentStats.student_id == Student.id)
+        .where(StudentStats.average >= threshold)
+        .order_by(Student.id)
+    )
+    if with_grades:
+        query = query.options(*grade_loader_options(loading))
+    with registry.reading("school") as session:
+        rows = [
+            {"id": student.id, "name": student.name, "average": avg,
+             **({"grades": grade_details(student)} if with_grades else {})}
+            for student, avg in session.execute(query).unique()
+        ]
+    if as_dicts:
+        return rows
+    print(f"Студенти з відзнакою (>={threshold}):")
+    for row in rows:
+        print(f"{row['name']} (середній бал: {row['average']:.2f})")
+
+# Звіт по всій школі: кожен студент з групою, середнім балом та всіма оцінками.
+# Кількість запитів не залежить від кількості студентів (для "selectin" — пачки по 500 id).
+def school_report(loading=DEFAULT_LOADING):
+    query = (
+        db.select(Student, StudentStats.average)
+        .outerjoin(StudentStats, StudentStats.student_id == Student.id)
+        .order_by(Student.id)
+        .options(*grade_loader_options(loading))
+    )
+    with registry.reading("school") as session:
+        return [
+            {"id": student.id, "name": student.name, "group": student.group, "average": avg,
+             "grades": grade_details(student)}
+            for student, avg in session.execute(query).unique()
+        ]
+
+# Регресійний бенчмарк: кількість SQL-запитів звітів при зростанні кількості студентів.
+# Для "selectin" кількість обмежена пачками по 500 батьківських id, для "joined" — один запит.
+def benchmark_report_statements(sizes=(100, 1_000, 5_000), grades_per_student=3):
+    import math
+    import random
+
+    for size in sizes:
+        with registry.temporary("school"):
+            with registry.unit_of_work("school") as session:
+                session.execute(db.insert(Student.__table__),
+                                [{"name": f"Student {i}", "group": "Bench"} for i in range(size)])
+                session.execute(db.insert(Subject.__table__), [{"name": f"Subject {i}"} for i in range(5)])
+                session.execute(db.insert(Grade.__table__), [
+                    {"student_id": student_id, "subject_id": random.randint(1, 5), "value": random.randint(80, 100)}
+                    for student_id in range(1, size + 1) for _ in range(grades_per_student)
+                ])
+            rebuild_grade_stats()
+
+            statements = [0]
+
+            def count_statement(*args):
+                statements[0] += 1
+
+            engine = registry.engine("school")
+            db.event.listen(engine, "before_cursor_execute", count_statement)
+            counts = {}
+            for label, call in (
+                ("lazy", lambda: school_report(loading="lazy")),
+                ("selectin", lambda: school_report(loading="selectin")),
+                ("joined", lambda: school_report(loading="joined")),
+                ("honors", lambda: list_honors(as_dicts=True, with_grades=True)),
+            ):
+                statements[0] = 0
+                call()
+                counts[label] = statements[0]
+                registry.remove("school")
+            db.event.remove(engine, "before_cursor_execute", count_statement)
+
+            batches = math.ceil(size / 500)
+            assert counts["selectin"] <= 1 + 2 * batches, counts
+            assert counts["honors"] <= 1 + 2 * batches, counts
+            assert counts["joined"] == 1, counts
+            print(f"{size:>6} студентів: запитів lazy={counts['lazy']}, selectin={counts['selectin']}, "
+                  f"joined={counts['joined']}, list_honors={counts['honors']}")
 
-def list_honors():
-    print("Студенти з відзнакою (>=90):")
-    for student in session.query(Student).all():
-        grades = [g.value for g in student.grades]
-        if grades:
-            avg = sum(grades) / len(grades)
-            if avg >= 90:
-                print(f"{student.name} (середній бал: {avg:.2f})")
+# Бенчмарк реєстру: час імпорту модуля та накладні витрати на один запит
+# (новий двигун і сесія на кожен запит проти пулу з'єднань і scoped_session)
+def benchmark_registry_overhead(requests_count=2_000):
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    code = "import time; t = time.perf_counter(); import intro_orm; print(time.perf_counter() - t)"
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=tmp, capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONPATH": module_dir},
+        ).stdout
+        print(f"Імпорт intro_orm: {float(output.split()[-1]) * 1000:.1f} мс, створено файлів: {len(os.listdir(tmp))}")
+
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        began = time.perf_counter()
+        for _ in range(requests_count):
+            request_engine = create_engine(url)
+            with Session(bind=request_engine) as request_session:
+                request_session.execute(db.text("SELECT 1"))
+            request_engine.dispose()
+        per_engine = (time.perf_counter() - began) / requests_count
+
+        bench_registry = DatabaseRegistry()
+        bench_registry.configure("bench", url)
+        began = time.perf_counter()
+        for _ in range(requests_count):
+            with bench_registry.unit_of_work("bench") as request_session:
+                request_session.execute(db.text("SELECT 1"))
+            bench_registry.remove("bench")
+        per_registry = (time.perf_counter() - began) / requests_count
+        bench_registry.dispose()
+    print(f"Новий двигун на запит: {per_engine * 1e6:.0f} мкс, реєстр з пулом: {per_registry * 1e6:.0f} мкс")
+
+# Бенчмарк конкурентного режиму: 1 потік-записувач виставляє оцінки, readers потоків
+# паралельно будують звіт відмінників; порівнюються звичайний журнал і WAL з пулом читачів
+def benchmark_concurrent_mode(readers=4, seconds=3.0, students_count=1_000):
+    import random
+
+    honors_query = (
+        db.select(Student.name, StudentStats.average)
+        .join(StudentStats, StudentStats.student_id == Student.id)
+        .where(StudentStats.average >= 90)
+    )
+    for mode in ("default", "concurrent"):
+        with tempfile.TemporaryDirectory() as tmp:
+            bench_registry = DatabaseRegistry()
+            bench_registry.configure("school", f"sqlite:///{os.path.join(tmp, 'school.db')}", SchoolBase.metadata)
+            if mode == "concurrent":
+                bench_registry.enable_concurrent_mode("school", readers=readers)
+            with bench_registry.unit_of_work("school") as session:
+                session.execute(db.insert(Student.__table__),
+                                [{"name": f"Student {i}", "group": "Bench"} for i in range(students_count)])
+                session.execute(db.insert(Subject.__table__), [{"name": "Math"}])
+            bench_registry.remove()
+
+            stop = threading.Event()
+            counters = {"writes": 0, "reads": 0, "errors": 0}
+            counters_lock = threading.Lock()
+
+            def count(key):
+                with counters_lock:
+                    counters[key] += 1
+
+            def writer():
+                while not stop.is_set():
+                    student_id, value = random.randint(1, students_count), random.randint(60, 100)
+                    try:
+                        with bench_registry.unit_of_work("school") as session:
+                            session.execute(db.insert(Grade.__table__).values(
+                                student_id=student_id, subject_id=1, value=value))
+                            update_grade_stats(session, {student_id: (1, value)}, {1: (1, value)})
+                        count("writes")
+                    except db.exc.OperationalError:
+                        count("errors")
+                bench_registry.remove()
+
+            def reader():
+                while not stop.is_set():
+                    try:
+                        with bench_registry.reading("school") as session:
+                            session.execute(honors_query).all()
+                        count("reads")
+                    except db.exc.OperationalError:
+                        count("errors")
+                bench_registry.remove()
+
+            workers = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+            for thread in workers:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in workers:
+                thread.join()
+            bench_registry.dispose()
+        print(f"{mode:>10}: 1 записувач + {readers} читачів — "
+              f"{counters['writes'] / seconds:,.0f} записів/с, {counters['reads'] / seconds:,.0f} звітів/с, "
+              f"помилок: {counters['errors']}")
 
 # ---------- Приклади використання функцій ----------
-add_student("Bob", "Python")
-add_student("Alice", "Python")
-add_student("John", "Python")
+def school_demo():
+    add_student("Bob", "Python")
+    add_student("Alice", "Python")
+    add_student("John", "Python")
+
+    add_subject("Math")
+    add_subject("English")
 
-add_subject("Math")
-add_subject("English")
+    give_grade("Bob", "Math", 95)
+    give_grade("Alice", "Math", 100)
+    give_grade("Alice", "English", 85)
+    give_grade("John", "English", 90)
+    give_grade("Bob", "English", 60)
 
-give_grade("Bob", "Math", 95)
-give_grade("Alice", "Math", 100)
-give_grade("Alice", "English", 85)
-give_grade("John", "English", 90)
-give_grade("Bob", "English", 60)
+    student_average("Bob")
+    student_average("Alice")
+    student_average("John")
 
-student_average("Bob")
-student_average("Alice")
-student_average("John")
+    subject_average("Math")
+    subject_average("English")
 
-subject_average("Math")
-subject_average("English")
+    list_honors()
 
-list_honors()
+# Демонстрація запускається лише при виконанні файлу як скрипта;
+# бенчмарки — з прапорцем --bench: python intro_orm.py --bench
+if __name__ == "__main__":
+    core_demo()
+    users_demo()
+    restaurant_demo()
+    school_demo()
+    if "--bench" in sys.argv:
+        benchmark_registry_overhead()
+        benchmark_concurrent_mode()
+        benchmark_report_statements()
+        benchmark_import_matches()
+        benchmark_book_table()
+        benchmark_book_tables_bulk()
+        benchmark_core_statements()
+        stress_book_table()
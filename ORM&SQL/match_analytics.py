@@ -0,0 +1,206 @@
+"""
+Колонкова аналітика матчів: JOIN Matchs та Divisions читається пачками прямо в масиви NumPy
+(код дивізіону, голи господарів, голи гостей), а статистика по дивізіонах рахується
+векторно через np.bincount замість циклу Python по рядках результату.
+Масиви можна зберегти у Parquet (якщо встановлено pyarrow) або в .npy-файли,
+які потім відкриваються через memory map без повторного читання бази.
+"""
+from itertools import chain
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import sqlalchemy as db
+
+from intro_orm import registry, Matchs, Divisions, matches_with_divisions_query
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# ---------- Завантаження в масиви ----------
+def load_divisions(conn):
+    query = db.select(Divisions.c.Division, Divisions.c.Name, Divisions.c.Country).order_by(Divisions.c.Division)
+    return [{"division": code, "name": name, "country": country} for code, name, country in conn.execute(query)]
+
+# Код дивізіону перетворюється на його номер у списку divisions ще в SQL,
+# тож кожна пачка — це лише цілі числа.
+# Матчі без рахунку (NULL у FTHG / FTAG) пропускаються.
+def load_columns(conn=None, batch_size=100_000):
+    if conn is None:
+        with registry.engine("core").connect() as conn:
+            return load_columns(conn, batch_size)
+    divisions = load_divisions(conn)
+    if not divisions:
+        empty = np.empty(0, dtype=np.int32)
+        return {"divisions": divisions, "division": empty, "home_goals": empty, "away_goals": empty}
+    division_index = db.case({row["division"]: index for index, row in enumerate(divisions)}, value=Matchs.c.Div)
+    query = (
+        db.select(division_index, Matchs.c.FTHG, Matchs.c.FTAG)
+        .select_from(db.join(Matchs, Divisions, Matchs.c.Div == Divisions.c.Division))
+        .where(Matchs.c.FTHG.is_not(None), Matchs.c.FTAG.is_not(None))
+    )
+    # Пачки читаються курсором DBAPI напряму: кортежі sqlite3 без обгортки Row SQLAlchemy
+    # (майже вдвічі швидше), а значення пачки розгортаються в один потік для np.fromiter
+    compiled = query.compile(dialect=conn.dialect)
+    cursor = conn.connection.cursor()
+    chunks = []
+    try:
+        cursor.execute(str(compiled), [compiled.params[name] for name in compiled.positiontup])
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            chunks.append(np.fromiter(chain.from_iterable(batch), dtype=np.int32, count=len(batch) * 3).reshape(-1, 3))
+    finally:
+        cursor.close()
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int32)
+    return {
+        "divisions": divisions,
+        "division": np.ascontiguousarray(data[:, 0]),
+        "home_goals": np.ascontiguousarray(data[:, 1]),
+        "away_goals": np.ascontiguousarray(data[:, 2]),
+    }
+
+# ---------- Збереження та відкриття ----------
+COLUMN_NAMES = ("division", "home_goals", "away_goals")
+
+# Каталог path: matches.parquet (pyarrow) або <стовпець>.npy, а також divisions.json
+def export_columns(columns, path, file_format=None):
+    file_format = file_format or ("parquet" if pa is not None else "npy")
+    if file_format == "parquet" and pa is None:
+        raise RuntimeError("Для Parquet потрібен пакет pyarrow")
+    if file_format not in ("parquet", "npy"):
+        raise ValueError(f"Непідтримуваний формат: {file_format}")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "divisions.json"), "w", encoding="utf-8") as target:
+        json.dump(columns["divisions"], target, ensure_ascii=False)
+    if file_format == "parquet":
+        pq.write_table(pa.table({name: columns[name] for name in COLUMN_NAMES}), os.path.join(path, "matches.parquet"))
+    else:
+        for name in COLUMN_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), columns[name])
+    return file_format
+
+def load_exported(path):
+    with open(os.path.join(path, "divisions.json"), encoding="utf-8") as source:
+        columns = {"divisions": json.load(source)}
+    parquet_path = os.path.join(path, "matches.parquet")
+    if os.path.exists(parquet_path):
+        if pq is None:
+            raise RuntimeError("Для Parquet потрібен пакет pyarrow")
+        table = pq.read_table(parquet_path)
+        columns.update({name: table.column(name).to_numpy() for name in COLUMN_NAMES})
+    else:
+        columns.update({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMN_NAMES})
+    return columns
+
+# ---------- Статистика по дивізіонах ----------
+def division_stats(columns):
+    divisions = columns["divisions"]
+    count = len(divisions)
+    codes, home, away = columns["division"], columns["home_goals"], columns["away_goals"]
+    matches = np.bincount(codes, minlength=count)
+    home_goals = np.bincount(codes, weights=home, minlength=count)
+    away_goals = np.bincount(codes, weights=away, minlength=count)
+    home_wins = np.bincount(codes[home > away], minlength=count)
+    draws = np.bincount(codes[home == away], minlength=count)
+    played = np.maximum(matches, 1)
+    return [
+        {
+            **division,
+            "matches": int(matches[i]),
+            "home_goals": int(home_goals[i]),
+            "away_goals": int(away_goals[i]),
+            "mean_home_goals": home_goals[i] / played[i] if matches[i] else None,
+            "mean_away_goals": away_goals[i] / played[i] if matches[i] else None,
+            "goal_difference": int(home_goals[i] - away_goals[i]),
+            "home_wins": int(home_wins[i]),
+            "draws": int(draws[i]),
+            "away_wins": int(matches[i] - home_wins[i] - draws[i]),
+            "home_win_ratio": home_wins[i] / played[i] if matches[i] else None,
+        }
+        for i, division in enumerate(divisions)
+    ]
+
+# Та сама статистика циклом Python по рядках fetchall() (для порівняння)
+def division_stats_loop(conn):
+    totals = {row["division"]: {**row, "matches": 0, "home_goals": 0, "away_goals": 0, "home_wins": 0, "draws": 0}
+              for row in load_divisions(conn)}
+    for division, _, _, _, home, away in conn.execute(matches_with_divisions_query()).fetchall():
+        if home is None or away is None:
+            continue
+        total = totals[division]
+        total["matches"] += 1
+        total["home_goals"] += home
+        total["away_goals"] += away
+        if home > away:
+            total["home_wins"] += 1
+        elif home == away:
+            total["draws"] += 1
+    stats = []
+    for total in totals.values():
+        played = total["matches"]
+        stats.append({
+            **total,
+            "mean_home_goals": total["home_goals"] / played if played else None,
+            "mean_away_goals": total["away_goals"] / played if played else None,
+            "goal_difference": total["home_goals"] - total["away_goals"],
+            "away_wins": played - total["home_wins"] - total["draws"],
+            "home_win_ratio": total["home_wins"] / played if played else None,
+        })
+    return stats
+
+def print_stats(stats):
+    for row in stats:
+        if row["matches"]:
+            print(f"{row['division']} {row['name']}: матчів {row['matches']}, "
+                  f"середні голи {row['mean_home_goals']:.2f}:{row['mean_away_goals']:.2f}, "
+                  f"різниця {row['goal_difference']:+d}, перемоги вдома {row['home_win_ratio']:.1%}")
+
+# ---------- Бенчмарк ----------
+def benchmark_analytics(rows=1_000_000, divisions_count=8):
+    with registry.temporary("core", "core.sqlite") as tmp:
+        with registry.engine("core").begin() as conn:
+            conn.execute(db.insert(Divisions), [
+                {"Division": f"D{i}", "Name": f"Division {i}", "Country": "Ukraine"} for i in range(divisions_count)
+            ])
+            conn.execute(db.text("""
+                INSERT INTO "Matchs" ("Div", "HomeTeam", "FTHG", "FTAG")
+                WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :rows)
+                SELECT 'D' || (i % :divisions), 'Team ' || (i % 100), abs(random()) % 5, abs(random()) % 4 FROM n
+            """), {"rows": rows, "divisions": divisions_count})
+
+        with registry.engine("core").connect() as conn:
+            began = time.perf_counter()
+            expected = division_stats_loop(conn)
+            loop_seconds = time.perf_counter() - began
+
+            began = time.perf_counter()
+            columns = load_columns(conn)
+            load_seconds = time.perf_counter() - began
+        began = time.perf_counter()
+        actual = division_stats(columns)
+        stats_seconds = time.perf_counter() - began
+
+        file_format = export_columns(columns, os.path.join(tmp, "export"))
+        began = time.perf_counter()
+        exported = division_stats(load_exported(os.path.join(tmp, "export")))
+        exported_seconds = time.perf_counter() - began
+
+        same = all(
+            all(np.isclose(a[key], e[key]) if isinstance(e[key], float) else a[key] == e[key] for key in e)
+            for a, e in zip(actual, expected)
+        ) and exported == actual
+        print(f"{rows:,} матчів: цикл по fetchall() {loop_seconds:.2f} с; "
+              f"NumPy: читання пачками {load_seconds:.2f} с + статистика {stats_seconds * 1000:.1f} мс; "
+              f"з файлу ({file_format}) {exported_seconds * 1000:.1f} мс; результати збігаються: {same}")
+
+if __name__ == "__main__":
+    print_stats(division_stats(load_columns()))
+    if "--bench" in sys.argv:
+        benchmark_analytics()
@@ -0,0 +1,191 @@
+"""
+Інструментування SQL-запитів через події двигуна SQLAlchemy.
+Для кожної логічної операції (наприклад, виклику list_honors) рахує кількість запитів,
+сумарний час SQL, повтори запитів однакової форми (ознака N+1) та вміє показати
+EXPLAIN QUERY PLAN для найповільніших запитів. Вмикається та вимикається під час роботи,
+а sample_rate дозволяє відстежувати лише частину операцій у продакшені.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import random
+import sys
+import time
+
+import sqlalchemy as db
+from sqlalchemy.engine import Engine
+
+# Звіт по одній логічній операції
+class OperationReport:
+    def __init__(self, name, slow_statements):
+        self.name = name
+        self.statements = 0
+        self.sql_time = 0.0
+        self.shapes = Counter()
+        self.slowest = []  # [(час, SQL, параметри, двигун)], відсортовано за спаданням часу
+        self._slow_statements = slow_statements
+
+    def record(self, engine, statement, parameters, elapsed):
+        self.statements += 1
+        self.sql_time += elapsed
+        self.shapes[statement] += 1
+        if len(self.slowest) < self._slow_statements or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement, parameters, engine))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self._slow_statements:]
+
+    # Запити однакової форми, що повторилися щонайменше threshold разів
+    def n_plus_one(self, threshold):
+        return [(statement, count) for statement, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self, threshold):
+        lines = [f"[SQL] {self.name}: {self.statements} запитів, {self.sql_time * 1000:.2f} мс SQL"]
+        for statement, count in self.n_plus_one(threshold):
+            lines.append(f"[N+1] {count} разів: {' '.join(statement.split())[:120]}")
+        return "\n".join(lines)
+
+class QueryProfiler:
+    def __init__(self, sample_rate=1.0, n_plus_one_threshold=5, slow_statements=3, log=print):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_statements = slow_statements
+        self.log = log
+        self.reports = []  # Останні звіти (не більше max_reports)
+        self.max_reports = 100
+        self._current = ContextVar("query_profiler_operation", default=None)
+        self._installed = False
+
+    # Слухачі подій реєструються на класі Engine, тому охоплюють і двигуни,
+    # які реєстр створить пізніше; поки профайлер вимкнений, вони нічого не роблять.
+    def install(self):
+        if not self._installed:
+            db.event.listen(Engine, "before_cursor_execute", self._before_execute)
+            db.event.listen(Engine, "after_cursor_execute", self._after_execute)
+            db.event.listen(Engine, "handle_error", self._on_error)
+            self._installed = True
+
+    def enable(self, sample_rate=None):
+        self.install()
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # Стек (контекст виконання, момент початку) з'єднання; запис знімається лише тим
+    # запитом, що його поклав, — після успішного виконання або в handle_error, якщо запит упав
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current.get() is not None:
+            conn.info.setdefault("query_profiler_started", []).append((context, time.perf_counter()))
+
+    def _pop_started(self, conn, context):
+        stack = conn.info.get("query_profiler_started")
+        if stack and stack[-1][0] is context:
+            return stack.pop()[1]
+        return None
+
+    def _on_error(self, exception_context):
+        if exception_context.connection is not None:
+            self._pop_started(exception_context.connection, exception_context.execution_context)
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = self._pop_started(conn, context)
+        report = self._current.get()
+        if report is None or started is None:
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        report.record(conn.engine, statement, parameters, time.perf_counter() - started)
+
+    # Логічна операція: всі SQL-запити всередині блоку потрапляють в один звіт.
+    # Повертає звіт або None, якщо профайлер вимкнений чи операцію не вибрано вибіркою.
+    @contextmanager
+    def operation(self, name):
+        if not self.enabled or self._current.get() is not None or random.random() >= self.sample_rate:
+            yield None
+            return
+        report = OperationReport(name, self.slow_statements)
+        token = self._current.set(report)
+        try:
+            yield report
+        finally:
+            self._current.reset(token)
+            self.reports.append(report)
+            del self.reports[:-self.max_reports]
+            if self.log and (report.n_plus_one(self.n_plus_one_threshold) or self.sample_rate >= 1.0):
+                self.log(report.summary(self.n_plus_one_threshold))
+
+    # Декоратор: кожен виклик функції — окрема логічна операція
+    def track(self, name=None):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.operation(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # EXPLAIN QUERY PLAN для найповільніших запитів звіту
+    def explain_slowest(self, report):
+        plans = []
+        for elapsed, statement, parameters, engine in report.slowest:
+            with engine.connect() as conn:
+                plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append((elapsed, statement, [row[-1] for row in plan]))
+            if self.log:
+                self.log(f"[PLAN] {elapsed * 1000:.3f} мс: {' '.join(statement.split())[:120]}")
+                for detail in plans[-1][2]:
+                    self.log(f"       {detail}")
+        return plans
+
+profiler = QueryProfiler()
+
+# Бенчмарк накладних витрат: вимкнений профайлер, вибірка 1% та повне відстеження
+def benchmark_overhead(func, calls=2_000):
+    results = {}
+    log = profiler.log
+    profiler.log = None
+    for label, enabled, sample_rate in (("вимкнено", False, 1.0), ("вибірка 1%", True, 0.01), ("усі", True, 1.0)):
+        profiler.enabled = enabled
+        profiler.sample_rate = sample_rate
+        profiler.install()
+        began = time.perf_counter()
+        for _ in range(calls):
+            with profiler.operation(func.__name__):
+                func()
+        results[label] = (time.perf_counter() - began) / calls
+        print(f"{label:>10}: {results[label] * 1e6:.1f} мкс на виклик")
+    profiler.log = log
+    profiler.disable()
+    return results
+
+if __name__ == "__main__":
+    import intro_orm
+    from intro_orm import registry, Student, add_student, add_subject, give_grade, list_honors
+
+    for name in ("Bob", "Alice", "John"):
+        add_student(name, "Python")
+    add_subject("Math")
+    for name, value in (("Bob", 95), ("Alice", 100), ("John", 90)):
+        give_grade(name, "Math", value)
+
+    profiler.enable()
+    # Звіт відмінників через агрегати — один запит
+    with profiler.operation("list_honors") as report:
+        list_honors(as_dicts=True)
+    profiler.explain_slowest(report)
+
+    # Ледаче завантаження student.grades у циклі — класичний N+1
+    profiler.n_plus_one_threshold = 3
+    with profiler.operation("lazy_grades") as report:
+        session = registry.session("school")
+        for student in session.scalars(db.select(Student)):
+            [grade.value for grade in student.grades]
+        session.rollback()
+    profiler.disable()
+
+    if "--bench" in sys.argv:
+        benchmark_overhead(lambda: intro_orm.student_average("Bob", as_dicts=True))
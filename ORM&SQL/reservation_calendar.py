@@ -0,0 +1,291 @@
+"""
+Кеш календаря бронювань ресторану в пам'яті процесу.
+Для кожного дня зберігаються відсортовані початки бронювань кожного столика та відповідні кінці,
+тож питання "які столики вільні о 18:00, 18:30, 19:00..." не виконують SQL-запитів.
+Кеш оновлюється точково після commit сесій бази "restaurant": нові бронювання додаються
+у відповідні дні, видалені — прибираються; незрозумілі зміни (UPDATE, DELETE через Core)
+скидають кеш повністю. Зміни з інших процесів та в обхід сесій кеш не бачить.
+"""
+from bisect import bisect_left, bisect_right
+from contextlib import redirect_stdout
+from datetime import datetime, time as day_time, timedelta
+import io
+import random
+import sys
+import threading
+import time
+
+import sqlalchemy as db
+
+from intro_orm import (
+    registry, change_tracker, SessionChangeTracker, Table, Reservation, MAX_RESERVATION_MINUTES,
+    book_table, book_tables_bulk, free_tables_query,
+)
+
+# Дні, в кешах яких має бути бронювання з початком start:
+# кеш дня D містить бронювання, що почались в (D - MAX_RESERVATION_MINUTES, D + 1 день)
+def bucket_days(start):
+    day = start.date()
+    latest = start + timedelta(minutes=MAX_RESERVATION_MINUTES)
+    while datetime.combine(day, day_time()) < latest:
+        yield day
+        day += timedelta(days=1)
+
+class ReservationCalendar:
+    def __init__(self, name="restaurant"):
+        self.name = name
+        self.engine = None
+        self._tables = None   # [(table_id, seats)], відсортовано за id
+        self._days = {}       # день -> {table_id: ([початки], [кінці])}
+        self._version = 0     # Збільшується при кожній зміні кешу
+        self._lock = threading.Lock()
+        self._changes = change_tracker(name)
+        self._changes.subscribe(self)
+
+    # ---------- Зміни (див. SessionChangeTracker) ----------
+    def collect_flush(self, session, pending):
+        for obj in session.new:
+            if isinstance(obj, Reservation):
+                pending.append(("add", obj.table_id, obj.reserved_at, obj.duration_minutes))
+            elif isinstance(obj, Table):
+                pending.append(("reset_tables",))
+        for obj in session.deleted:
+            if isinstance(obj, Reservation):
+                pending.append(("remove", obj.table_id, obj.reserved_at, obj.duration_minutes))
+            elif isinstance(obj, Table):
+                pending.append(("reset_tables",))
+        for obj in session.dirty:
+            if isinstance(obj, (Reservation, Table)) and session.is_modified(obj):
+                pending.append(("reset",))
+
+    # Зміни через session.execute(insert/update/delete): executemany-вставку бронювань
+    # можна застосувати точково, решту — лише повним скиданням кешу
+    def collect_execute(self, orm_execute_state, pending):
+        table_name = SessionChangeTracker.table_name(orm_execute_state)
+        if table_name == Table.__tablename__:
+            pending.append(("reset_tables",))
+            return
+        if table_name != Reservation.__tablename__:
+            return
+        rows = orm_execute_state.parameters
+        if isinstance(rows, dict):
+            rows = [rows]
+        if (orm_execute_state.is_insert and rows
+                and all({"table_id", "reserved_at"} <= row.keys() for row in rows)):
+            for row in rows:
+                pending.append(("add", row["table_id"], row["reserved_at"], row.get("duration_minutes", 60)))
+        else:
+            pending.append(("reset",))
+
+    def apply_changes(self, pending):
+        with self._lock:
+            self._version += 1
+            for op, *args in pending:
+                if op == "add":
+                    self._apply(self._insert, *args)
+                elif op == "remove":
+                    self._apply(self._discard, *args)
+                elif op == "reset_tables":
+                    self._tables = None
+                else:
+                    self._days.clear()
+
+    # Застосування зміни до всіх завантажених днів, яких стосується бронювання
+    def _apply(self, change, table_id, start, duration_minutes):
+        end = start + timedelta(minutes=duration_minutes or 60)
+        for day in bucket_days(start):
+            tables = self._days.get(day)
+            if tables is not None:
+                starts, ends = tables.setdefault(table_id, ([], []))
+                change(starts, ends, start, end)
+
+    @staticmethod
+    def _insert(starts, ends, start, end):
+        index = bisect_right(starts, start)
+        starts.insert(index, start)
+        ends.insert(index, end)
+
+    @staticmethod
+    def _discard(starts, ends, start, end):
+        index = bisect_left(starts, start)
+        while index < len(starts) and starts[index] == start:
+            if ends[index] == end:
+                del starts[index], ends[index]
+                return
+            index += 1
+
+    def reset(self, engine):
+        with self._lock:
+            self.engine = engine
+            self._tables = None
+            self._days.clear()
+            self._version += 1
+
+    # ---------- Завантаження ----------
+
+    def _load_tables(self):
+        tables = self._tables
+        if tables is None:
+            version = self._version
+            with registry.reading(self.name) as session:
+                tables = session.execute(db.select(Table.id, Table.seats).order_by(Table.id)).all()
+            with self._lock:
+                if version == self._version:
+                    self._tables = tables
+        return tables
+
+    # Бронювання дня завантажуються одним запитом по індексу reserved_at.
+    # Якщо під час запиту кеш змінився, результат використовується, але не зберігається.
+    def _load_day(self, day):
+        tables = self._days.get(day)
+        if tables is not None:
+            return tables
+        version = self._version
+        day_start = datetime.combine(day, day_time())
+        tables = {}
+        with registry.reading(self.name) as session:
+            rows = session.execute(
+                db.select(Reservation.table_id, Reservation.reserved_at, Reservation.duration_minutes)
+                .where(Reservation.reserved_at > day_start - timedelta(minutes=MAX_RESERVATION_MINUTES),
+                       Reservation.reserved_at < day_start + timedelta(days=1))
+                .order_by(Reservation.reserved_at)
+            )
+            for table_id, start, duration_minutes in rows:
+                starts, ends = tables.setdefault(table_id, ([], []))
+                starts.append(start)
+                ends.append(start + timedelta(minutes=duration_minutes or 60))
+        with self._lock:
+            if version == self._version:
+                self._days[day] = tables
+        return tables
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._tables = None
+            self._days.clear()
+
+    # ---------- Запити ----------
+    @staticmethod
+    def _is_free(intervals, start, end):
+        if intervals is None:
+            return True
+        starts, ends = intervals
+        index = bisect_left(starts, end) - 1
+        lower = start - timedelta(minutes=MAX_RESERVATION_MINUTES)
+        while index >= 0 and starts[index] > lower:
+            if ends[index] > start:
+                return False
+            index -= 1
+        return True
+
+    # id столиків з >= seats місць, вільних на [start, start + duration_minutes)
+    def free_tables(self, seats, start, duration_minutes=60):
+        if not 0 < duration_minutes <= MAX_RESERVATION_MINUTES:
+            raise ValueError(f"Тривалість бронювання має бути від 1 до {MAX_RESERVATION_MINUTES} хвилин")
+        self._changes.sync(self)
+        end = start + timedelta(minutes=duration_minutes)
+        days = [self._load_day(start.date())]
+        if (end - timedelta(microseconds=1)).date() != start.date():
+            days.append(self._load_day(end.date()))
+        tables = self._load_tables()
+        # Списки початків і кінців змінюються після commit під блокуванням,
+        # тож читаються теж під ним, щоб не побачити початок без відповідного кінця
+        with self._lock:
+            return [
+                table_id for table_id, table_seats in tables
+                if table_seats >= seats and all(self._is_free(day.get(table_id), start, end) for day in days)
+            ]
+
+    # Вільні слоти дня: [(початок, [id столиків])] з кроком step_minutes у межах робочих годин
+    def free_slots(self, day, seats, duration_minutes=60, step_minutes=30,
+                   opens=day_time(10, 0), closes=day_time(23, 0)):
+        slot = datetime.combine(day, opens)
+        last = datetime.combine(day, closes) - timedelta(minutes=duration_minutes)
+        slots = []
+        while slot <= last:
+            tables = self.free_tables(seats, slot, duration_minutes)
+            if tables:
+                slots.append((slot, tables))
+            slot += timedelta(minutes=step_minutes)
+        return slots
+
+calendar_cache = ReservationCalendar()
+
+# ---------- Перевірка узгодженості ----------
+# Випадкові бронювання (book_table, book_tables_bulk), скасування, відкочені транзакції
+# та вставки через Core; після кожної операції відповіді кешу звіряються з SQL-запитом free_tables_query.
+def fuzz_consistency(operations=300, checks_per_operation=5, tables_count=12, seed=None):
+    rng = random.Random(seed)
+    base = datetime(2025, 4, 18, 0, 0)
+
+    def random_moment():
+        # Два дні з бронюваннями, що перетинають північ
+        return base + timedelta(minutes=15 * rng.randrange(2 * 24 * 4))
+
+    mismatches = 0
+    cache_time = sql_time = 0.0
+    with registry.temporary(calendar_cache.name):
+        with registry.unit_of_work(calendar_cache.name) as session:
+            session.add_all(Table(seats=rng.randint(2, 8)) for _ in range(tables_count))
+        for _ in range(operations):
+            action = rng.random()
+            with redirect_stdout(io.StringIO()):
+                if action < 0.5:
+                    book_table(rng.randint(2, 8), random_moment(), rng.choice((30, 60, 90, 120, 360)))
+                elif action < 0.65:
+                    book_tables_bulk([(rng.randint(2, 8), random_moment(), rng.choice((60, 90)))
+                                      for _ in range(rng.randint(1, 10))])
+                elif action < 0.8:
+                    with registry.unit_of_work(calendar_cache.name) as session:
+                        reservation = session.scalars(
+                            db.select(Reservation).order_by(db.func.random()).limit(1)).first()
+                        if reservation is not None:
+                            session.delete(reservation)
+                elif action < 0.9:
+                    session = registry.session(calendar_cache.name)
+                    session.add(Reservation(table_id=rng.randint(1, tables_count),
+                                            reserved_at=random_moment(), duration_minutes=60))
+                    session.flush()
+                    session.rollback()
+                elif action < 0.95:
+                    with registry.unit_of_work(calendar_cache.name) as session:
+                        session.add(Table(seats=rng.randint(2, 8)))
+                else:
+                    with registry.unit_of_work(calendar_cache.name) as session:
+                        session.execute(db.delete(Reservation).where(
+                            Reservation.table_id == rng.randint(1, tables_count)))
+            for _ in range(checks_per_operation):
+                seats, moment, duration = rng.randint(2, 8), random_moment(), rng.choice((30, 60, 240))
+                began = time.perf_counter()
+                cached = calendar_cache.free_tables(seats, moment, duration)
+                cache_time += time.perf_counter() - began
+                began = time.perf_counter()
+                with registry.reading(calendar_cache.name) as session:
+                    expected = list(session.scalars(
+                        free_tables_query(seats, moment, duration).with_only_columns(Table.id)))
+                sql_time += time.perf_counter() - began
+                if cached != expected:
+                    mismatches += 1
+    checks = operations * checks_per_operation
+    print(f"{operations} операцій, {checks} перевірок: розбіжностей {mismatches}; "
+          f"кеш {cache_time / checks * 1e6:.1f} мкс, SQL {sql_time / checks * 1e6:.1f} мкс на запит")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    from intro_orm import add_table
+
+    add_table(2)
+    add_table(4)
+    day = datetime(2025, 4, 17)
+    # Перше звернення завантажує день одним запитом, наступні — лише з пам'яті
+    print("Вільні столики на 2 особи о 18:00:", calendar_cache.free_tables(2, day.replace(hour=18)))
+    book_table(2, day.replace(hour=18))
+    print("Після бронювання:", calendar_cache.free_tables(2, day.replace(hour=18)))
+    for slot, tables in calendar_cache.free_slots(day.date(), 2, opens=day_time(17, 0), closes=day_time(21, 0)):
+        print(f"{slot:%H:%M}: столики {tables}")
+
+    if "--bench" in sys.argv:
+        fuzz_consistency(operations=1_000)
+    else:
+        fuzz_consistency()
@@ -0,0 +1,166 @@
+"""
+Шардування бронювань ресторанів: кожен ресторан зберігає свої столики та бронювання
+в окремому файлі SQLite з тими ж моделями Table / Reservation.
+Карта шардів визначає файл бази для кожного ресторану, записи в різні ресторани йдуть
+через різні двигуни реєстру й не чекають одне одного, а звіти по всіх ресторанах
+збираються паралельними запитами до всіх шардів.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import io
+import os
+import sys
+import threading
+import time
+
+import sqlalchemy as db
+
+import intro_orm
+from intro_orm import registry, RestaurantBase, Table, Reservation, free_tables_query
+
+# ---------- Карта шардів ----------
+class ShardMap:
+    # url_template — шаблон URL бази ресторану; prefix — префікс імен баз у реєстрі
+    def __init__(self, url_template="sqlite:///restaurant_{restaurant_id}.db", prefix="restaurant_shard_",
+                 **engine_options):
+        self.url_template = url_template
+        self.prefix = prefix
+        self.engine_options = {"connect_args": {"timeout": 30}, **engine_options}
+        self._placements = {}  # restaurant_id -> URL бази
+        self._lock = threading.Lock()
+
+    # Явне розміщення ресторану (наприклад, великого — на окремому диску); до першого звернення
+    def assign(self, restaurant_id, url):
+        with self._lock:
+            if restaurant_id in self._placements:
+                raise RuntimeError(f"Ресторан {restaurant_id} вже розміщено в {self._placements[restaurant_id]}")
+            self._placements[restaurant_id] = url
+            registry.configure(self.prefix + str(restaurant_id), url, RestaurantBase.metadata, **self.engine_options)
+
+    # Ім'я бази ресторану в реєстрі; новий ресторан отримує базу за шаблоном
+    def database(self, restaurant_id):
+        if restaurant_id not in self._placements:
+            with self._lock:
+                if restaurant_id not in self._placements:
+                    url = self.url_template.format(restaurant_id=restaurant_id)
+                    registry.configure(self.prefix + str(restaurant_id), url, RestaurantBase.metadata,
+                                       **self.engine_options)
+                    self._placements[restaurant_id] = url
+        return self.prefix + str(restaurant_id)
+
+    def restaurants(self):
+        return sorted(self._placements)
+
+shard_map = ShardMap()
+
+# ---------- Записи: той самий API, що й для однієї бази ----------
+def add_table(restaurant_id, seats):
+    intro_orm.add_table(seats, database=shard_map.database(restaurant_id))
+
+def book_table(restaurant_id, requested_seats, desired_time, duration_minutes=60):
+    return intro_orm.book_table(requested_seats, desired_time, duration_minutes,
+                                database=shard_map.database(restaurant_id))
+
+# ---------- Читання з усіх шардів ----------
+# Виконує query(session) в кожному шарді паралельно; повертає {restaurant_id: результат}
+def fan_out(query, restaurant_ids=None, workers=8):
+    restaurant_ids = shard_map.restaurants() if restaurant_ids is None else list(restaurant_ids)
+
+    def run(restaurant_id):
+        database = shard_map.database(restaurant_id)
+        try:
+            with registry.reading(database) as session:
+                result = query(session)
+                session.rollback()
+                return result
+        finally:
+            registry.remove(database)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(restaurant_ids, pool.map(run, restaurant_ids)))
+
+# Звіт за день: кількість бронювань і заброньованих хвилин у кожному ресторані
+def daily_report(day):
+    day_start = datetime.combine(day, datetime.min.time())
+    query = (
+        db.select(db.func.count(Reservation.id), db.func.coalesce(db.func.sum(Reservation.duration_minutes), 0))
+        .where(Reservation.reserved_at >= day_start, Reservation.reserved_at < day_start + timedelta(days=1))
+    )
+    return {restaurant_id: {"reservations": count, "minutes": minutes}
+            for restaurant_id, (count, minutes) in fan_out(lambda session: session.execute(query).one()).items()}
+
+# Вільні столики на заданий час у всіх ресторанах: {restaurant_id: [id столиків]}
+def free_tables_everywhere(requested_seats, desired_time, duration_minutes=60):
+    query = free_tables_query(requested_seats, desired_time, duration_minutes).with_only_columns(Table.id)
+    return fan_out(lambda session: list(session.scalars(query)))
+
+# ---------- Бенчмарк ----------
+BENCH_START = datetime(2025, 4, 18, 10, 0)
+
+def shard_writer(url_template, prefix, restaurant_id, offset, bookings, start_at):
+    # Процес бенчмарку: власна карта шардів, а отже власні двигуни та з'єднання з базою.
+    # Чекає спільного моменту start_at (за time.time()), бронює bookings власних часових слотів
+    # (бронювання різних процесів не конфліктують) і повертає (момент завершення, кількість помилок).
+    from contextlib import redirect_stdout
+
+    database = ShardMap(url_template, prefix).database(restaurant_id)
+    errors = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    with redirect_stdout(io.StringIO()):
+        for i in range(bookings):
+            try:
+                intro_orm.book_table(2, BENCH_START + timedelta(hours=offset * bookings + i), 60, database=database)
+            except db.exc.OperationalError:
+                errors += 1
+    finished = time.time()
+    registry.dispose()
+    return finished, errors
+
+# processes процесів-записувачів одночасно бронюють столики: спершу всі в одну базу, потім кожен —
+# у свій ресторан-шард; для порівняння — один процес. Окремі процеси не ділять GIL і з'єднання,
+# тож записи в різні файли йдуть паралельно, а в одну базу чекають на її єдине блокування на запис.
+# Бронювання здебільшого витрачає CPU, тож виграш шардів обмежений кількістю ядер (os.cpu_count()).
+def benchmark_shards(shards=8, processes=8, bookings_per_process=200, tables_per_restaurant=10):
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        print(f"Ядер CPU: {os.cpu_count()}")
+        for label, url_template, prefix, shards_used, writers in (
+            ("один процес", f"sqlite:///{os.path.join(tmp, 'alone.db')}", "bench_alone_", 1, 1),
+            ("одна база", f"sqlite:///{os.path.join(tmp, 'single.db')}", "bench_single_", 1, processes),
+            (f"{shards} шардів", f"sqlite:///{os.path.join(tmp, 'shard_{restaurant_id}.db')}", "bench_shard_",
+             shards, processes),
+        ):
+            shard = ShardMap(url_template, prefix)
+            targets = [i % shards_used for i in range(writers)]
+            for restaurant_id in set(targets):
+                with registry.unit_of_work(shard.database(restaurant_id)) as session:
+                    session.execute(db.insert(Table), [{"seats": 4}] * tables_per_restaurant)
+            # Процеси відкривають власні з'єднання (після fork успадковані закривати не можна)
+            registry.dispose()
+            start_at = time.time() + 1.0  # 1 с на запуск процесів
+            with multiprocessing.Pool(writers) as pool:
+                finished = pool.starmap(shard_writer, [
+                    (url_template, prefix, restaurant_id, offset, bookings_per_process, start_at)
+                    for offset, restaurant_id in enumerate(targets)
+                ])
+            elapsed = max(moment for moment, _ in finished) - start_at
+            errors = sum(count for _, count in finished)
+            results[label] = (writers * bookings_per_process - errors) / elapsed
+            print(f"{label:>11}: процесів {writers}, {results[label]:,.0f} бронювань/с, помилок {errors}")
+        registry.dispose()
+    return results
+
+if __name__ == "__main__":
+    for restaurant_id, seats in ((1, 2), (1, 4), (2, 4), (3, 6)):
+        add_table(restaurant_id, seats)
+    book_table(1, 2, datetime(2025, 4, 17, 18, 0))
+    book_table(2, 2, datetime(2025, 4, 17, 18, 0))
+    book_table(2, 4, datetime(2025, 4, 17, 18, 30))
+    print("Звіт за день:", daily_report(datetime(2025, 4, 17).date()))
+    print("Вільні столики о 18:00:", free_tables_everywhere(2, datetime(2025, 4, 17, 18, 0)))
+
+    if "--bench" in sys.argv:
+        benchmark_shards()
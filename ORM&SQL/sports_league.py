@@ -0,0 +1,269 @@
+"""
+Спортивна ліга за завданням Tasks/ORM_TASK.md: команди, гравці та матчі.
+Статистика оновлюється атомарними UPDATE ... SET x = x + 1 без читання поточних значень,
+а лідер ліги та найкращий гравець команди шукаються індексованим ORDER BY ... LIMIT 1.
+"""
+from datetime import datetime
+import random
+import sys
+import threading
+import time
+
+import sqlalchemy as db
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import declarative_base, relationship
+
+from intro_orm import registry
+
+LeagueBase = declarative_base()
+
+# ---------- Моделі ----------
+class Team(LeagueBase):
+    __tablename__ = "teams"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)       # Назва команди
+    games_played = Column(Integer, nullable=False, default=0)  # Кількість зіграних матчів
+    wins = Column(Integer, nullable=False, default=0)          # Кількість перемог
+    losses = Column(Integer, nullable=False, default=0)        # Кількість поразок
+    draws = Column(Integer, nullable=False, default=0)         # Кількість нічиїх
+    players = relationship("Player", back_populates="team")
+
+    def __repr__(self):
+        return (f"<Team(name={self.name}, games={self.games_played}, wins={self.wins}, "
+                f"losses={self.losses}, draws={self.draws})>")
+
+    # Проведення матчу з іншою командою (ця команда — господар)
+    def play_game(self, opponent, goals_for, goals_against, played_at=None):
+        return record_match(self.id, opponent.id, goals_for, goals_against, played_at)
+
+    # Ручне оновлення статистики атомарними інкрементами
+    def update_stats(self, wins=0, losses=0, draws=0):
+        with registry.unit_of_work("league") as session:
+            session.execute(team_increment(), [{
+                "team_id": self.id, "games": wins + losses + draws,
+                "wins": wins, "losses": losses, "draws": draws,
+            }])
+
+    # Команда з найбільшою кількістю перемог
+    @classmethod
+    def get_leader(cls):
+        return get_leader()
+
+    # Найкращий гравець команди за кількістю забитих м'ячів
+    def get_best_player(self):
+        return get_best_player(self.id)
+
+# Індекс для пошуку лідера: ORDER BY wins DESC, id LIMIT 1 читає лише перший запис індексу
+db.Index("ix_teams_wins_desc_id", Team.wins.desc(), Team.id)
+
+class Player(LeagueBase):
+    __tablename__ = "players"
+    __table_args__ = (
+        # Індекс для пошуку найкращого бомбардира команди
+        db.Index("ix_players_team_id_goals_scored", "team_id", "goals_scored"),
+    )
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)                      # Ім'я гравця
+    position = Column(String, nullable=False)                  # Позиція гравця
+    goals_scored = Column(Integer, nullable=False, default=0)  # Забиті голи
+    goals_saved = Column(Integer, nullable=False, default=0)   # Відбиті м'ячі (для воротарів)
+    team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
+    team = relationship("Team", back_populates="players")
+
+    def __repr__(self):
+        return f"<Player(name={self.name}, position={self.position}, goals_scored={self.goals_scored})>"
+
+class Match(LeagueBase):
+    __tablename__ = "matches"
+    id = Column(Integer, primary_key=True)
+    home_team_id = Column(Integer, ForeignKey("teams.id"), nullable=False, index=True)
+    away_team_id = Column(Integer, ForeignKey("teams.id"), nullable=False, index=True)
+    home_goals = Column(Integer, nullable=False)
+    away_goals = Column(Integer, nullable=False)
+    played_at = Column(DateTime, nullable=False)
+
+# timeout — скільки секунд з'єднання чекає на блокування SQLite при паралельних записах
+registry.configure("league", "sqlite:///league.db", LeagueBase.metadata, connect_args={"timeout": 30})
+
+# ---------- Функціональність ----------
+# UPDATE teams SET games_played = games_played + :games, wins = wins + :wins, ... WHERE id = :team_id
+def team_increment():
+    teams = Team.__table__
+    return (
+        teams.update()
+        .where(teams.c.id == db.bindparam("team_id"))
+        .values(
+            games_played=teams.c.games_played + db.bindparam("games"),
+            wins=teams.c.wins + db.bindparam("wins"),
+            losses=teams.c.losses + db.bindparam("losses"),
+            draws=teams.c.draws + db.bindparam("draws"),
+        )
+    )
+
+def add_team(name):
+    try:
+        with registry.unit_of_work("league") as session:
+            team = Team(name=name)
+            session.add(team)
+    except db.exc.IntegrityError:
+        print(f"Команда {name} вже існує")
+        return registry.session("league").scalars(db.select(Team).where(Team.name == name)).one()
+    print(f"Додано команду {name}")
+    return team
+
+# Додавання гравця до команди
+def add_player(team, name, position, goals_scored=0, goals_saved=0):
+    with registry.unit_of_work("league") as session:
+        player = Player(name=name, position=position, goals_scored=goals_scored,
+                        goals_saved=goals_saved, team_id=team.id)
+        session.add(player)
+    print(f"Додано гравця {name} ({position}) до команди {team.name}")
+    return player
+
+# Оновлення статистики гравця: приріст забитих голів та відбитих м'ячів
+def update_player_stats(player_id, goals_scored=0, goals_saved=0):
+    players = Player.__table__
+    with registry.unit_of_work("league") as session:
+        session.execute(
+            players.update()
+            .where(players.c.id == player_id)
+            .values(goals_scored=players.c.goals_scored + goals_scored,
+                    goals_saved=players.c.goals_saved + goals_saved)
+        )
+
+# Приріст статистики обох команд за результатом матчу
+def match_deltas(home_team_id, away_team_id, home_goals, away_goals):
+    home = {"team_id": home_team_id, "games": 1, "wins": 0, "losses": 0, "draws": 0}
+    away = {"team_id": away_team_id, "games": 1, "wins": 0, "losses": 0, "draws": 0}
+    if home_goals > away_goals:
+        home["wins"] = away["losses"] = 1
+    elif home_goals < away_goals:
+        home["losses"] = away["wins"] = 1
+    else:
+        home["draws"] = away["draws"] = 1
+    return [home, away]
+
+# Запис результату матчу: вставка матчу та інкременти статистики однією транзакцією
+def record_match(home_team_id, away_team_id, home_goals, away_goals, played_at=None):
+    if home_team_id == away_team_id:
+        raise ValueError("Команда не може грати сама з собою")
+    with registry.unit_of_work("league") as session:
+        session.execute(db.insert(Match.__table__).values(
+            home_team_id=home_team_id, away_team_id=away_team_id,
+            home_goals=home_goals, away_goals=away_goals, played_at=played_at or datetime.now(),
+        ))
+        session.execute(team_increment(), match_deltas(home_team_id, away_team_id, home_goals, away_goals))
+
+# Масовий запис матчів: matches — список (home_team_id, away_team_id, home_goals, away_goals, played_at).
+# Прирости сумуються по командах, тож на кожну команду припадає один UPDATE у executemany.
+def record_matches(matches):
+    totals = {}
+    rows = []
+    for home_team_id, away_team_id, home_goals, away_goals, played_at in matches:
+        if home_team_id == away_team_id:
+            raise ValueError("Команда не може грати сама з собою")
+        rows.append({"home_team_id": home_team_id, "away_team_id": away_team_id,
+                     "home_goals": home_goals, "away_goals": away_goals, "played_at": played_at})
+        for delta in match_deltas(home_team_id, away_team_id, home_goals, away_goals):
+            total = totals.setdefault(delta["team_id"], dict.fromkeys(("games", "wins", "losses", "draws"), 0))
+            for key in total:
+                total[key] += delta[key]
+    if not rows:
+        return
+    with registry.unit_of_work("league") as session:
+        session.execute(db.insert(Match.__table__), rows)
+        session.execute(team_increment(), [{"team_id": team_id, **total} for team_id, total in totals.items()])
+
+# Команда-лідер за кількістю перемог (при рівності — та, що додана раніше)
+def get_leader():
+    session = registry.session("league")
+    return session.scalars(db.select(Team).order_by(Team.wins.desc(), Team.id).limit(1)).first()
+
+# Найкращий гравець команди за кількістю забитих м'ячів
+def get_best_player(team_id):
+    session = registry.session("league")
+    return session.scalars(
+        db.select(Player).where(Player.team_id == team_id).order_by(Player.goals_scored.desc()).limit(1)
+    ).first()
+
+# ---------- Навантажувальний тест ----------
+# threads потоків паралельно записують матчі; batch_size=1 — кожен матч окремою транзакцією.
+# Після тесту статистика команд звіряється з очікуваною, порахованою в Python.
+def load_test(matches_count=20_000, threads=8, batch_size=50, teams_count=20):
+    session = registry.session("league")
+    first_id = session.scalar(db.select(db.func.coalesce(db.func.max(Team.id), 0))) + 1
+    with registry.unit_of_work("league") as session:
+        session.execute(db.insert(Team.__table__), [
+            {"name": f"Load Team {first_id + i}-{time.time_ns()}"} for i in range(teams_count)
+        ])
+    team_ids = list(range(first_id, first_id + teams_count))
+
+    before = {team.id: (team.games_played, team.wins, team.losses, team.draws)
+              for team in session.scalars(db.select(Team).where(Team.id.in_(team_ids)))}
+    session.commit()
+    matches = []
+    for _ in range(matches_count):
+        home, away = random.sample(team_ids, 2)
+        matches.append((home, away, random.randint(0, 4), random.randint(0, 4), datetime(2025, 5, 5)))
+    errors = []
+
+    def worker(part):
+        try:
+            for start in range(0, len(part), batch_size):
+                batch = part[start:start + batch_size]
+                if batch_size == 1:
+                    record_match(*batch[0])
+                else:
+                    record_matches(batch)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            registry.remove("league")
+
+    workers = [threading.Thread(target=worker, args=(matches[i::threads],)) for i in range(threads)]
+    began = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    expected = {team_id: list(stats) for team_id, stats in before.items()}
+    for home, away, home_goals, away_goals, _ in matches:
+        for delta in match_deltas(home, away, home_goals, away_goals):
+            stats = expected[delta["team_id"]]
+            for index, key in enumerate(("games", "wins", "losses", "draws")):
+                stats[index] += delta[key]
+    session = registry.session("league")
+    actual = {team.id: [team.games_played, team.wins, team.losses, team.draws]
+              for team in session.scalars(db.select(Team).where(Team.id.in_(team_ids)))}
+    session.commit()
+    consistent = not errors and actual == expected
+    print(f"{matches_count} матчів, {threads} потоків, пачка {batch_size}: "
+          f"{matches_count / elapsed:,.0f} матчів/с, статистика узгоджена: {consistent}")
+    return consistent
+
+if __name__ == "__main__":
+    # Створення команд
+    team1 = add_team("FC First")
+    team2 = add_team("FC Second")
+
+    # Додавання гравців до команди
+    player1 = add_player(team1, "Іван Петренко", "нападник", goals_scored=5)
+    player2 = add_player(team1, "Олексій Коваленко", "півзахисник", goals_scored=2)
+    player3 = add_player(team2, "Андрій Ткаченко", "воротар", goals_scored=0, goals_saved=10)
+
+    # Проведення матчу та оновлення статистики гравців
+    team1.play_game(team2, 2, 1, datetime(2025, 5, 5))
+    update_player_stats(player2.id, goals_scored=2)
+    update_player_stats(player3.id, goals_saved=4)
+
+    # Визначення лідера за кількістю перемог
+    print("Лідер:", Team.get_leader())
+
+    # Визначення найкращого гравця команди
+    print("Найкращий гравець:", team1.get_best_player())
+
+    if "--bench" in sys.argv:
+        load_test(matches_count=2_000, batch_size=1)
+        load_test()
@@ -0,0 +1,268 @@
+"""
+Кеш користувачів (таблиця users бази example.db) у пам'яті процесу з читанням наскрізь:
+пошук за username або id спершу дивиться в кеш, а при промаху виконує запит і зберігає рядок.
+Записи — кортежі (id, username, email), як у sqlite3 "SELECT * FROM users", тож кеш спільний
+для ORM-коду та fetch_user_data з exceptions.py. Розмір обмежено (LRU-витіснення), кожен запис
+живе не довше ttl секунд. Відсутні користувачі теж кешуються (на коротший negative_ttl), щоб
+перебір неіснуючих імен у потоці аутентифікації не йшов щоразу в базу. Після commit сесій бази "users" змінені та видалені користувачі
+прибираються з кешу точково, нові — знімають відмітку "відсутній"; зміни через Core скидають кеш повністю.
+Зміни в обхід сесій SQLAlchemy (інший процес, sqlite3 напряму) кеш бачить лише після закінчення TTL.
+"""
+from collections import OrderedDict
+import random
+import sys
+import threading
+import time
+
+import sqlalchemy as db
+
+from intro_orm import registry, change_tracker, SessionChangeTracker, User
+
+USER_COLUMNS = (User.id, User.username, User.email)
+
+class UserCache:
+    def __init__(self, name="users", maxsize=10_000, ttl=300.0, negative_ttl=30.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.engine = None
+        self._entries = OrderedDict()  # id -> (момент закінчення, рядок); від найдавніше використаного
+        self._ids = {}                 # username -> id
+        self._missing = OrderedDict()  # ("id" | "username", значення) -> момент закінчення
+        self._version = 0              # Збільшується при кожній інвалідації
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._changes = change_tracker(name)
+        self._changes.subscribe(self)
+
+    # ---------- Зміни (див. SessionChangeTracker) ----------
+    # Запам'ятовуються id та всі імена (старе й нове) змінених, видалених і нових користувачів:
+    # нове ім'я могло бути раніше закешоване за іншим id
+    def collect_flush(self, session, pending):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if not isinstance(obj, User):
+                continue
+            history = db.inspect(obj).attrs.username.history
+            pending.append(("id", obj.id))
+            pending.extend(("username", name) for name in (obj.username, *history.deleted))
+
+    def collect_execute(self, orm_execute_state, pending):
+        if SessionChangeTracker.table_name(orm_execute_state) == User.__tablename__:
+            pending.append(("all", None))
+
+    def apply_changes(self, pending):
+        if ("all", None) in pending:
+            self.clear()
+            return
+        with self._lock:
+            self._version += 1
+            for kind, value in pending:
+                self._missing.pop((kind, value), None)
+                user_id = value if kind == "id" else self._ids.get(value)
+                if self._drop(user_id):
+                    self._stats["invalidations"] += 1
+
+    def reset(self, engine):
+        with self._lock:
+            self.engine = engine
+        self.clear()
+
+    # ---------- Сховище ----------
+    # Викликаються під self._lock
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        username = entry[1][1]
+        if self._ids.get(username) == user_id:
+            del self._ids[username]
+        return True
+
+    def _lookup(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(user_id)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def _lookup_missing(self, key):
+        expires = self._missing.get(key)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._missing[key]
+            self._stats["expirations"] += 1
+            return False
+        self._missing.move_to_end(key)
+        return True
+
+    # row=None — відмітка "відсутній" для key
+    def _store(self, key, row, version):
+        with self._lock:
+            # Якщо під час запиту був commit зі змінами користувачів, рядок міг застаріти
+            if version != self._version:
+                return
+            if row is None:
+                self._missing[key] = time.monotonic() + self.negative_ttl
+                self._missing.move_to_end(key)
+                while len(self._missing) > self.maxsize:
+                    self._missing.popitem(last=False)
+                    self._stats["evictions"] += 1
+                return
+            self._drop(row[0])
+            self._entries[row[0]] = (time.monotonic() + self.ttl, row)
+            self._ids[row[1]] = row[0]
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    # ---------- Читання наскрізь ----------
+    # loader() повертає рядок (id, username, email) або None (користувача немає);
+    # виключення loader передаються викликачу, і нічого не кешується
+    def _get(self, kind, value, loader):
+        self._changes.sync(self)
+        key = (kind, value)
+        with self._lock:
+            user_id = value if kind == "id" else self._ids.get(value)
+            row = self._lookup(user_id)
+            if row is not None or self._lookup_missing(key):
+                self._stats["hits"] += 1
+                return row
+            self._stats["misses"] += 1
+            version = self._version
+        row = loader()
+        if row is not None:
+            row = tuple(row)
+        self._store(key, row, version)
+        return row
+
+    def _load(self, condition):
+        with registry.reading(self.name) as session:
+            return session.execute(db.select(*USER_COLUMNS).where(condition)).first()
+
+    def get_by_id(self, user_id, loader=None):
+        return self._get("id", user_id, loader or (lambda: self._load(User.id == user_id)))
+
+    def get_by_username(self, username, loader=None):
+        return self._get("username", username, loader or (lambda: self._load(User.username == username)))
+
+    # Для змін в обхід сесій SQLAlchemy
+    def invalidate(self, user_id=None, username=None):
+        with self._lock:
+            self._version += 1
+            self._missing.pop(("id", user_id), None)
+            self._missing.pop(("username", username), None)
+            for candidate in (user_id, self._ids.get(username)):
+                if self._drop(candidate):
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._ids.clear()
+            self._missing.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), missing=len(self._missing))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+user_cache = UserCache()
+
+# ---------- Перевірка узгодженості та бенчмарк ----------
+# Випадкові читання, зміни email і username, видалення, додавання та відкочені транзакції;
+# після кожної операції відповіді кешу звіряються з базою. Потім — швидкість гарячого читання.
+def benchmark_user_cache(users=1_000, operations=2_000, lookups=100_000, seed=None):
+    rng = random.Random(seed)
+    mismatches = 0
+    with registry.temporary(user_cache.name):
+        with registry.unit_of_work(user_cache.name) as session:
+            session.execute(db.insert(User), [
+                {"username": f"user{i}", "email": f"user{i}@example.com"} for i in range(users)
+            ])
+        user_cache.clear()
+        user_cache.reset_stats()
+        next_name = users
+        for _ in range(operations):
+            action = rng.random()
+            user_id, username = rng.randint(1, next_name), f"user{rng.randrange(next_name)}"
+            if action < 0.15:
+                with registry.unit_of_work(user_cache.name) as session:
+                    user = session.get(User, user_id)
+                    if user is not None:
+                        user.email = f"{rng.random()}@example.com"
+                        if rng.random() < 0.3:
+                            user.username = f"user{next_name}"
+                            next_name += 1
+            elif action < 0.2:
+                with registry.unit_of_work(user_cache.name) as session:
+                    user = session.get(User, user_id)
+                    if user is not None:
+                        session.delete(user)
+            elif action < 0.25:
+                with registry.unit_of_work(user_cache.name) as session:
+                    session.add(User(username=f"user{next_name}", email="new@example.com"))
+                    next_name += 1
+            elif action < 0.3:
+                session = registry.session(user_cache.name)
+                user = session.get(User, user_id)
+                if user is not None:
+                    user.email = "rolled.back@example.com"
+                    session.flush()
+                session.rollback()
+            for kind, value in (("id", user_id), ("username", username)):
+                cached = (user_cache.get_by_id(value) if kind == "id" else user_cache.get_by_username(value))
+                expected = user_cache._load(User.id == value if kind == "id" else User.username == value)
+                if cached != (tuple(expected) if expected is not None else None):
+                    mismatches += 1
+        print(f"{operations} операцій: розбіжностей {mismatches}; метрики {user_cache.stats()}")
+
+        # Потік аутентифікації: здебільшого наявні користувачі, кожне десяте ім'я — неіснуюче
+        with registry.reading(user_cache.name) as session:
+            existing = list(session.scalars(db.select(User.username)))
+        names = [rng.choice(existing) if i % 10 else f"unknown{rng.randrange(100)}" for i in range(lookups)]
+        session = registry.session(user_cache.name)
+        began = time.perf_counter()
+        for name in names[:lookups // 10]:
+            session.query(User).filter_by(username=name).first()
+        query_us = (time.perf_counter() - began) / (lookups // 10) * 1e6
+        session.rollback()
+        user_cache.reset_stats()
+        began = time.perf_counter()
+        for name in names:
+            user_cache.get_by_username(name)
+        cache_us = (time.perf_counter() - began) / lookups * 1e6
+        print(f"Читання за username: query().filter_by() {query_us:.1f} мкс, кеш {cache_us:.2f} мкс "
+              f"(влучань {user_cache.stats()['hit_ratio']:.1%})")
+        user_cache.clear()
+    return mismatches == 0
+
+if __name__ == "__main__":
+    with registry.unit_of_work("users") as session:
+        session.add(User(username="JaneDoe", email="jane@example.com"))
+    print("Перше читання (з бази):", user_cache.get_by_username("JaneDoe"))
+    print("Повторне читання (з кешу):", user_cache.get_by_username("JaneDoe"))
+    with registry.unit_of_work("users") as session:
+        session.scalars(db.select(User).filter_by(username="JaneDoe")).one().email = "jane.doe@example.com"
+    print("Після оновлення:", user_cache.get_by_username("JaneDoe"))
+    with registry.unit_of_work("users") as session:
+        session.delete(session.scalars(db.select(User).filter_by(username="JaneDoe")).one())
+    print("Після видалення:", user_cache.get_by_username("JaneDoe"))
+    print("Метрики:", user_cache.stats())
+
+    if "--bench" in sys.argv:
+        benchmark_user_cache(operations=10_000, lookups=1_000_000)
+    else:
+        benchmark_user_cache()
@@ -1,12 +1,17 @@
 # Приклад завантаження файлів з використанням asyncio
 import asyncio
+from contextlib import redirect_stdout
+import io
 import random
+import sys
 import time
 import threading
 import requests
 import aiohttp
 import multiprocessing
 
+from decorators import async_cache
+
 # Асинхронне завантаження файлу
 async def download_file(name):
     print(f"Початок завантаження файлу {name}")
@@ -52,11 +57,18 @@ async def get_external_price(product_id):
     await asyncio.sleep(1.0)
     return round(random.uniform(500,700))
 
+# Кешовані варіанти: дані товару живуть у кеші 60 секунд, ціна — 10 секунд.
+# Одночасні запити того самого товару чекають один спільний виклик БД / API.
+get_from_db_cached = async_cache(maxsize=1024, ttl=60)(get_from_db)
+get_external_price_cached = async_cache(maxsize=1024, ttl=10)(get_external_price)
+
 # Обробка запиту користувача
-async def handle_request(product_id):
+async def handle_request(product_id, cached=False):
     print(f"Обробляємо запит для товару {product_id}...")
-    db_task = asyncio.create_task(get_from_db(product_id))
-    price_task = asyncio.create_task(get_external_price(product_id))
+    get_product = get_from_db_cached if cached else get_from_db
+    get_price = get_external_price_cached if cached else get_external_price
+    db_task = asyncio.create_task(get_product(product_id))
+    price_task = asyncio.create_task(get_price(product_id))
     product_data = await db_task
     price = await price_task
     response = {
@@ -67,11 +79,28 @@ async def handle_request(product_id):
     print(f"Відповідь для користувача: {response}")
 
 # Основна функція обробки запитів до товарів
-async def handle_products_main():
-    product_ids = [101, 102, 103]
-    tasks = [handle_request(pid) for pid in product_ids]
+async def handle_products_main(product_ids=(101, 102, 103), cached=False):
+    tasks = [handle_request(pid, cached) for pid in product_ids]
     await asyncio.gather(*tasks)
 
+# Запити з повторюваними товарами без кешу та з кешем: кількість звернень до БД і API
+# рахується за їхніми повідомленнями. Другий прохід з кешем не звертається до них зовсім.
+def benchmark_products_cache(products=(101, 102, 103), repeats=20):
+    product_ids = list(products) * repeats
+    random.shuffle(product_ids)
+    get_from_db_cached.cache_clear()
+    get_external_price_cached.cache_clear()
+    for label, cached in (("без кешу", False), ("з кешем", True), ("з кешем, повторно", True)):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            began = time.perf_counter()
+            asyncio.run(handle_products_main(product_ids, cached))
+            elapsed = time.perf_counter() - began
+        log = output.getvalue()
+        print(f"{label:>18}: {len(product_ids)} запитів, звернень до БД {log.count('Шукаємо товар')}, "
+              f"до API {log.count('Отримуємо ціну')}, {elapsed:.2f} с")
+    print("Кеш БД:", get_from_db_cached.cache_info())
+
 # Перевірка користувача
 async def check_user_login(username, password):
     print(f"Перевіряємо користувача {username}")
@@ -190,6 +219,12 @@ if __name__ == "__main__":
     end = time.time()
     print(f"Загальний час: {end - start:.2f} секунд")
 
+    # Ті самі запити з повторюваними товарами через кеш: один виклик БД та API на товар
+    asyncio.run(handle_products_main([101, 102, 101, 103, 102, 101], cached=True))
+    print("Кеш БД:", get_from_db_cached.cache_info())
+    if "--bench" in sys.argv:
+        benchmark_products_cache()
+
     # Логін та чат
     asyncio.run(login_and_chat_main())
 
@@ -174,46 +174,479 @@ def process_order1(order):
     return "Order processed"
 
 #############################################
-# 11. Декоратор для обмеження кількості викликів (Rate Limit)
+# 11. Декоратор для обмеження частоти викликів (Rate Limit)
 #############################################
-def rate_limited(limit):
-    # Фабрика декораторів, що обмежує кількість викликів функції.
-    calls = 0  # Лічильник викликів.
+import asyncio
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+class RateLimitExceeded(Exception):
+    # Виклик відхилено; retry_after — через скільки секунд з'явиться дозвіл.
+    def __init__(self, retry_after, message="Rate limit exceeded"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    # Відро на capacity жетонів, що поповнюється зі швидкістю rate жетонів за секунду:
+    # допускає сплеск до capacity викликів, а в середньому — rate викликів за секунду.
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def acquire(self, now):
+        # 0 — дозвіл отримано, інакше — скільки секунд чекати на наступний жетон.
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class SlidingWindowLog:
+    # Журнал моментів дозволених викликів: за будь-які period секунд — не більше limit викликів.
+    def __init__(self, limit, period, now):
+        self.limit = limit
+        self.period = period
+        self.log = deque()
+
+    def acquire(self, now):
+        log = self.log
+        while log and log[0] <= now - self.period:
+            log.popleft()
+        if len(log) < self.limit:
+            log.append(now)
+            return 0.0
+        return log[0] + self.period - now
+
+class MemoryBackend:
+    # Стан лімітів у пам'яті процесу: у кожного процесу власний бюджет викликів.
+    # Зберігається стан max_keys останніх ключів: стан давно неактивного ключа відкидається.
+    def __init__(self, max_keys=10_000):
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, limiter, key):
+        # (скільки секунд чекати або 0, момент рішення)
+        with self._lock:
+            now = time.monotonic()
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = limiter.new_state(now)
+                if len(self._states) > self.max_keys:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+            return state.acquire(now), now
+
+class SQLiteBackend:
+    # Стан лімітів у файлі SQLite: спільний бюджет для всіх процесів машини, що відкривають path.
+    # Кожне рішення — коротка транзакція BEGIN IMMEDIATE, тож процеси читають і змінюють стан по черзі;
+    # час береться з time.time() вже всередині транзакції. name відокремлює ліміти різних функцій в одному файлі.
+    # Раз на prune_interval секунд рішення заодно видаляє рядки name, що вже не впливають на ліміт:
+    # повні відра та записи журналу, старші за period.
+    def __init__(self, path, name="default", timeout=30, prune_interval=60.0):
+        self.path = path
+        self.name = name
+        self.timeout = timeout
+        self.prune_interval = prune_interval
+        self._pruned = 0.0
+        self._local = threading.local()  # З'єднання окреме для кожного потоку та процесу
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            local.connection.execute("PRAGMA journal_mode=WAL")
+            local.connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL);
+                CREATE TABLE IF NOT EXISTS rate_log (key TEXT, at REAL);
+                CREATE INDEX IF NOT EXISTS rate_log_key_at ON rate_log (key, at);
+            """)
+            local.pid = os.getpid()
+        return local.connection
+
+    def _prune(self, connection, limiter, now):
+        # Відро, не змінюване capacity / rate секунд, уже повне — як і відро, якого ще немає
+        prefix = f"{self.name}:"
+        if limiter.algorithm == "token_bucket":
+            connection.execute("DELETE FROM rate_buckets WHERE substr(key, 1, ?) = ? AND updated <= ?",
+                               (len(prefix), prefix, now - limiter.burst * limiter.period / limiter.limit))
+        else:
+            connection.execute("DELETE FROM rate_log WHERE substr(key, 1, ?) = ? AND at <= ?",
+                               (len(prefix), prefix, now - limiter.period))
+        self._pruned = now
+
+    def acquire(self, limiter, key):
+        connection = self._connection()
+        key = f"{self.name}:{key!r}"
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            if limiter.algorithm == "token_bucket":
+                row = connection.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                bucket = limiter.new_state(now)
+                if row is not None:
+                    bucket.tokens, bucket.updated = row
+                wait = bucket.acquire(now)
+                connection.execute("INSERT OR REPLACE INTO rate_buckets VALUES (?, ?, ?)", (key, bucket.tokens, now))
+            else:
+                connection.execute("DELETE FROM rate_log WHERE key = ? AND at <= ?", (key, now - limiter.period))
+                count, oldest = connection.execute(
+                    "SELECT count(*), min(at) FROM rate_log WHERE key = ?", (key,)).fetchone()
+                if count < limiter.limit:
+                    connection.execute("INSERT INTO rate_log VALUES (?, ?)", (key, now))
+                    wait = 0.0
+                else:
+                    wait = oldest + limiter.period - now
+            if now - self._pruned >= self.prune_interval:
+                self._prune(connection, limiter, now)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait, now
+
+class RateLimiter:
+    # limit викликів за period секунд окремо для кожного ключа (користувача, endpoint тощо).
+    # algorithm: "token_bucket" (burst — розмір сплеску, за замовчуванням limit) або "sliding_window".
+    # backend — де зберігається стан: MemoryBackend (за замовчуванням) або SQLiteBackend для кількох процесів.
+    ALGORITHMS = {"token_bucket", "sliding_window"}
+
+    def __init__(self, limit, period=1.0, algorithm="token_bucket", burst=None, max_keys=10_000, backend=None):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Невідомий алгоритм: {algorithm}")
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit та period мають бути додатними")
+        self.limit = limit
+        self.period = period
+        self.algorithm = algorithm
+        self.burst = burst or limit
+        self.backend = backend or MemoryBackend(max_keys)
+
+    def new_state(self, now):
+        if self.algorithm == "token_bucket":
+            return TokenBucket(self.limit / self.period, self.burst, now)
+        return SlidingWindowLog(self.limit, self.period, now)
+
+    def try_acquire(self, key=None):
+        # 0 — виклик дозволено, інакше — скільки секунд чекати.
+        return self.backend.acquire(self, key)[0]
+
+    def acquire(self, key=None, block=False, timeout=None):
+        # block=False — RateLimitExceeded одразу; block=True — чекає дозволу (не довше timeout секунд).
+        # Повертає момент дозволу за годинником бекенда.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait, now = self.backend.acquire(self, key)
+            if not wait:
+                return now
+            if not block or (deadline is not None and time.monotonic() + wait > deadline):
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, key=None, block=False, timeout=None):
+        # Те саме для корутин: очікування через asyncio.sleep не блокує цикл подій.
+        # Рішення інших бекендів (транзакція SQLiteBackend може чекати на блокування файлу) — в окремому потоці.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if isinstance(self.backend, MemoryBackend):
+                wait, now = self.backend.acquire(self, key)
+            else:
+                wait, now = await asyncio.to_thread(self.backend.acquire, self, key)
+            if not wait:
+                return now
+            if not block or (deadline is not None and time.monotonic() + wait > deadline):
+                raise RateLimitExceeded(wait)
+            await asyncio.sleep(wait)
+
+def rate_limited(limit, period=1.0, algorithm="token_bucket", key=None, block=False, timeout=None, burst=None,
+                 backend=None):
+    # Фабрика декораторів: не більше limit викликів за period секунд.
+    # key(*args, **kwargs) — ключ окремого ліміту (None — один ліміт на функцію).
+    # backend=SQLiteBackend(шлях, ім'я) — спільний ліміт для всіх процесів, що використовують цей файл.
+    # Декоратор працює і для звичайних, і для корутинних функцій; у корутин очікування асинхронне.
     def decorator(func):
-        nonlocal calls  # Дозволяємо змінювати змінну calls.
+        limiter = RateLimiter(limit, period, algorithm, burst, backend=backend)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await limiter.acquire_async(key(*args, **kwargs) if key else None, block, timeout)
+                return await func(*args, **kwargs)
+            async_wrapper.limiter = limiter
+            return async_wrapper
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            nonlocal calls
-            if calls >= limit:
-                # Якщо викликів більше або дорівнює ліміту, викликаємо виключення.
-                raise Exception("Rate limit exceeded")
-            calls += 1
+            limiter.acquire(key(*args, **kwargs) if key else None, block, timeout)
             return func(*args, **kwargs)
+        wrapper.limiter = limiter
         return wrapper
     return decorator
 
-@rate_limited(limit=3)
+@rate_limited(limit=3, period=60)
 def api_request(endpoint):
     # Функція для симуляції API-запиту до заданого endpoint.
     return f"Response from {endpoint}"
 
+def benchmark_rate_limiter(threads=64, limit=200, period=0.1, duration=1.0):
+    # Час рішення на один виклик та перевірка під навантаженням: threads потоків протягом
+    # duration секунд викликають функцію без очікування (reject) та з очікуванням (block).
+    # Дозволених викликів не може бути більше, ніж дає алгоритм за цей час.
+    for algorithm in ("token_bucket", "sliding_window"):
+        limiter = RateLimiter(10**9, 1.0, algorithm)
+        began = time.perf_counter()
+        for i in range(100_000):
+            limiter.try_acquire(i % 100)
+        decision_ns = (time.perf_counter() - began) / 100_000 * 1e9
+
+        for mode in ("reject", "block"):
+            granted = [0] * threads
+            limiter = RateLimiter(limit, period, algorithm)
+            stop = time.monotonic() + duration
+
+            def worker(index):
+                while time.monotonic() < stop:
+                    try:
+                        limiter.acquire("api", block=(mode == "block"), timeout=stop - time.monotonic())
+                    except RateLimitExceeded:
+                        continue
+                    granted[index] += 1
+
+            began = time.monotonic()
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.monotonic() - began
+            # Верхня межа: сплеск limit плюс поповнення (token_bucket) або limit на кожне вікно
+            if algorithm == "token_bucket":
+                allowed = limit + limit / period * elapsed
+            else:
+                allowed = limit * (int(elapsed / period) + 1)
+            total = sum(granted)
+            print(f"{algorithm:>14} {mode:>6}: рішення {decision_ns:.0f} нс; {threads} потоків за {elapsed:.2f} с "
+                  f"дозволено {total} викликів (межа {allowed:.0f}, {total / elapsed:.0f}/с при ліміті "
+                  f"{limit / period:.0f}/с) — {'OK' if total <= allowed else 'ПЕРЕВИЩЕНО'}")
+
+def shared_limiter_worker(path, algorithm, limit, period, stop_at):
+    # Процес стрес-тесту: викликає ліміт з очікуванням до stop_at (за time.time());
+    # path=None — власний ліміт у пам'яті процесу. Повертає моменти дозволів: для SQLite — моменти
+    # рішень усередині транзакцій (спільний годинник), для пам'яті — time.time() після дозволу.
+    backend = SQLiteBackend(path, "stress") if path else None
+    limiter = RateLimiter(limit, period, algorithm, backend=backend)
+    granted = []
+    while time.time() < stop_at:
+        try:
+            moment = limiter.acquire("api", block=True, timeout=stop_at - time.time())
+        except RateLimitExceeded:
+            break
+        granted.append(moment if path else time.time())
+    return granted
+
+def stress_shared_limiter(processes=8, limit=100, period=0.5, duration=3.0):
+    # processes процесів одночасно викликають функцію з лімітом limit за period секунд:
+    # з лімітом у пам'яті кожного процесу та зі спільним SQLiteBackend. Для спільного ліміту
+    # перевіряється, що в жодному вікні period секунд дозволів не більше, ніж дає алгоритм.
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for algorithm in ("token_bucket", "sliding_window"):
+            for label, path in (("пам'ять процесу", None), ("SQLite", os.path.join(tmp, f"{algorithm}.db"))):
+                started = time.time()
+                stop_at = started + duration + 0.5  # 0.5 с на запуск процесів
+                with multiprocessing.Pool(processes) as pool:
+                    results = pool.starmap(shared_limiter_worker,
+                                           [(path, algorithm, limit, period, stop_at)] * processes)
+                moments = sorted(moment for granted in results for moment in granted)
+                # Найбільша кількість дозволів у вікні period секунд (два вказівники)
+                busiest, first = 0, 0
+                for last, moment in enumerate(moments):
+                    while moment - moments[first] >= period:
+                        first += 1
+                    busiest = max(busiest, last - first + 1)
+                # token_bucket допускає сплеск burst (= limit) плюс поповнення за вікно
+                allowed = 2 * limit if algorithm == "token_bucket" else limit
+                elapsed = moments[-1] - moments[0] if len(moments) > 1 else duration
+                print(f"{algorithm:>14}, {label:>15}: {processes} процесів, {len(moments)} викликів, "
+                      f"{len(moments) / elapsed:.0f}/с при ліміті {limit / period:.0f}/с; "
+                      f"найбільше за вікно {period} с: {busiest} (межа {allowed}) — "
+                      f"{'OK' if busiest <= allowed else 'ПЕРЕВИЩЕНО'}")
+
+        # Накладні витрати на одне рішення в одному процесі
+        for label, backend in (("пам'ять процесу", None), ("SQLite", SQLiteBackend(os.path.join(tmp, "overhead.db")))):
+            limiter = RateLimiter(10**9, 1.0, backend=backend)
+            began = time.perf_counter()
+            for _ in range(5_000):
+                limiter.try_acquire("api")
+            print(f"Рішення ({label}): {(time.perf_counter() - began) / 5_000 * 1e6:.1f} мкс на виклик")
+
 #############################################
-# 12. Декоратор для простого кешування результатів функції
+# 12. Декоратор для кешування результатів функції з обмеженим розміром
 #############################################
+import sys
+from collections import namedtuple
 from time import sleep
 
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions maxsize maxbytes currsize currbytes")
+
+# Політики витіснення: відстежують ключі кешу та обирають, який ключ викинути.
+# Власна політика — клас з тими самими методами add, touch, remove та victim.
+class LRUPolicy:
+    # Витісняється ключ, до якого найдовше не зверталися.
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def add(self, key):
+        self._order[key] = None
+
+    def touch(self, key):
+        self._order.move_to_end(key)
+
+    def remove(self, key):
+        del self._order[key]
+
+    def victim(self):
+        return next(iter(self._order))
+
+class LFUPolicy:
+    # Витісняється ключ з найменшою кількістю звернень (серед рівних — найдавніший), O(1) на операцію.
+    def __init__(self):
+        self._counts = {}   # ключ -> кількість звернень
+        self._buckets = {}  # кількість звернень -> OrderedDict ключів
+        self._min = 0
+
+    def add(self, key):
+        self._counts[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min = 1
+
+    def touch(self, key):
+        count = self._counts[key]
+        self._discard(key, count)
+        if self._min == count and count not in self._buckets:
+            self._min = count + 1
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def remove(self, key):
+        self._discard(key, self._counts.pop(key))
+
+    def _discard(self, key, count):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+    def victim(self):
+        if self._min not in self._buckets:
+            self._min = min(self._buckets)
+        return next(iter(self._buckets[self._min]))
+
+CACHE_POLICIES = {"lru": LRUPolicy, "lfu": LFUPolicy}
+
+class _KwargsMark:
+    # Роздільник позиційних та іменованих аргументів у ключі кешу.
+    pass
+
+_KWARGS_MARK = (_KwargsMark,)
+_FAST_TYPES = {int, str}
+
+def make_key(args, kwargs, typed=False):
+    # Ключ кешу з позиційних та іменованих аргументів: f(1, b=2) та f(1, **{"b": 2}) дають один ключ,
+    # порядок іменованих аргументів не важливий. typed=True розрізняє f(1) та f(1.0).
+    key = args
+    if kwargs:
+        key += _KWARGS_MARK + tuple(sorted(kwargs.items()))
+    if typed:
+        key += tuple(type(value) for value in args)
+        if kwargs:
+            key += tuple(type(value) for _, value in sorted(kwargs.items()))
+    elif len(key) == 1 and type(key[0]) in _FAST_TYPES:
+        return key[0]
+    return key
+
+def bounded_cache(maxsize=128, policy="lru", maxbytes=None, sizeof=sys.getsizeof, typed=False):
+    # Фабрика декораторів кешування з обмеженням кількості записів (maxsize) та/або
+    # сумарного розміру результатів у байтах (maxbytes, розмір рахує sizeof — за замовчуванням
+    # sys.getsizeof, тобто без вкладених об'єктів). Коли обмеження перевищено, записи
+    # витісняються політикою policy: "lru", "lfu" або клас власної політики.
+    # Кеш безпечний для потоків; функція виконується поза блокуванням, тож одночасні промахи
+    # з тим самим ключем обчислюють результат кілька разів.
+    policy_class = CACHE_POLICIES[policy] if isinstance(policy, str) else policy
+    if maxsize is not None and maxsize <= 0:
+        raise ValueError("maxsize має бути додатним або None")
+
+    def decorator(func):
+        entries = {}  # ключ -> (результат, розмір у байтах)
+        order = policy_class()
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+
+        def evict():
+            key = order.victim()
+            order.remove(key)
+            stats["bytes"] -= entries.pop(key)[1]
+            stats["evictions"] += 1
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs, typed)
+            with lock:
+                entry = entries.get(key)
+                if entry is not None:
+                    stats["hits"] += 1
+                    order.touch(key)
+                    return entry[0]
+                stats["misses"] += 1
+            result = func(*args, **kwargs)
+            size = sizeof(result) if maxbytes is not None else 0
+            # Результат, більший за весь кеш, не зберігається.
+            if maxbytes is not None and size > maxbytes:
+                return result
+            with lock:
+                if key in entries:
+                    return result
+                while entries and ((maxsize is not None and len(entries) >= maxsize)
+                                   or (maxbytes is not None and stats["bytes"] + size > maxbytes)):
+                    evict()
+                entries[key] = (result, size)
+                order.add(key)
+                stats["bytes"] += size
+            return result
+
+        def cache_info():
+            with lock:
+                return CacheInfo(stats["hits"], stats["misses"], stats["evictions"],
+                                 maxsize, maxbytes, len(entries), stats["bytes"])
+
+        def cache_clear():
+            # Очищає записи та статистику.
+            nonlocal order
+            with lock:
+                entries.clear()
+                order = policy_class()
+                stats.update(hits=0, misses=0, evictions=0, bytes=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
 def simple_cache(func):
-    # Декоратор для кешування результатів функції.
-    cache = {}  # Словник для збереження кешованих результатів.
-    def wrapper(*args):
-        nonlocal cache
-        if args in cache:
-            # Якщо результат є в кеші, повертаємо його.
-            print("[CACHE] Повертаємо кешований результат")
-            return cache[args]
-        result = func(*args)
-        cache[args] = result  # Зберігаємо результат у кеш.
-        return result
-    return wrapper
+    # Кешування з параметрами за замовчуванням: LRU на 128 записів.
+    return bounded_cache()(func)
 
 @simple_cache
 def slow_func(x):
@@ -229,6 +662,53 @@ def slow_func2(x):
         sleep(1)
     return 2 ** x
 
+def benchmark_cache_overhead(calls=200_000, keys=100):
+    # Час одного влучання в кеш для функції-тотожності: functools.lru_cache, попередня
+    # реалізація simple_cache (необмежений словник, без друку) та bounded_cache з різними політиками.
+    from timeit import timeit
+
+    def legacy_simple_cache(func):
+        cache = {}
+        def wrapper(*args):
+            if args in cache:
+                return cache[args]
+            result = func(*args)
+            cache[args] = result
+            return result
+        return wrapper
+
+    def identity(x):
+        return x
+
+    variants = {
+        "functools.lru_cache": functools.lru_cache(maxsize=128)(identity),
+        "старий simple_cache": legacy_simple_cache(identity),
+        "bounded_cache LRU": bounded_cache(maxsize=128)(identity),
+        "bounded_cache LFU": bounded_cache(maxsize=128, policy="lfu")(identity),
+        "bounded_cache bytes": bounded_cache(maxsize=None, maxbytes=64 * 1024)(identity),
+    }
+    for name, cached in variants.items():
+        for x in range(keys):
+            cached(x)
+        seconds = timeit(lambda: [cached(x) for x in range(keys)], number=calls // keys)
+        print(f"{name:>22}: {seconds / calls * 1e9:.0f} нс на влучання")
+
+    # Одночасні виклики з 8 потоків: кеш не перевищує обмежень, а лічильники сходяться
+    stress = bounded_cache(maxsize=50, policy="lfu")(identity)
+    per_thread = calls // 8
+
+    def worker(seed):
+        for i in range(per_thread):
+            stress((seed * 7919 + i * 31) % (keys * 3))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    info = stress.cache_info()
+    print(f"8 потоків: {info}; узгоджено: {info.hits + info.misses == per_thread * 8 and info.currsize <= 50}")
+
 #############################################
 # 13. Декоратор для перевірки прав доступу (require_admin)
 #############################################
@@ -249,28 +729,162 @@ def delete_user(user, user_id):
 #############################################
 # 14. Декоратор з TTL (Time-to-Live) кешування
 #############################################
-import time
+import heapq
+
+class Flight:
+    # Обчислення, що вже виконується: інші виклики з тим самим ключем чекають на його результат.
+    # Замість threading.Event — захоплене блокування, яке звільняється після обчислення
+    # (створюється в рази швидше, а промах створює Flight щоразу).
+    __slots__ = ("done", "result", "error")
 
-def ttl_cache(ttl):
-    # Фабрика декораторів для TTL-кешування з заданим часом життя (ttl).
-    cache = {}  # Словник для збереження кешованих результатів разом з часовими мітками.
+    def __init__(self):
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.result = None
+        self.error = None
+
+    def finish(self):
+        self.done.release()
+
+    def wait(self):
+        with self.done:
+            pass
+
+class TTLStore:
+    # Сховище однієї функції: ключ -> [результат, момент застаріння, момент видалення].
+    # Купа (момент видалення, номер, ключ) дає найближчий до видалення запис за O(log n);
+    # записи купи для перезаписаних ключів видаляються ліниво.
+    def __init__(self, ttl, maxsize=None, stale_ttl=0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.entries = {}
+        self.heap = []
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.stats = dict.fromkeys(("hits", "stale_hits", "misses", "waits", "computations",
+                                    "refreshes", "refresh_errors", "expirations", "evictions"), 0)
+        self.sweeper = None
+        self.stopped = threading.Event()
+
+    # Викликаються під self.lock
+    def put(self, key, result, now):
+        if key in self.entries:
+            del self.entries[key]
+        remove_at = now + self.ttl + self.stale_ttl
+        self.entries[key] = [result, now + self.ttl, remove_at]
+        self.counter += 1
+        heapq.heappush(self.heap, (remove_at, self.counter, key))
+        self.purge(now)
+        while self.maxsize is not None and len(self.entries) > self.maxsize:
+            self.pop_head("evictions")
+        # Купа з великою часткою застарілих елементів перебудовується
+        if len(self.heap) > 2 * len(self.entries) + 1024:
+            self.heap = [(entry[2], self.counter + number, key)
+                         for number, (key, entry) in enumerate(self.entries.items(), 1)]
+            self.counter += len(self.heap)
+            heapq.heapify(self.heap)
+
+    def pop_head(self, counter):
+        remove_at, _, key = heapq.heappop(self.heap)
+        entry = self.entries.get(key)
+        if entry is not None and entry[2] == remove_at:
+            del self.entries[key]
+            self.stats[counter] += 1
+
+    def purge(self, now):
+        while self.heap and self.heap[0][0] <= now:
+            self.pop_head("expirations")
+
+    def sweep(self, interval):
+        # Фоновий потік: прибирає прострочені записи, навіть якщо функцію більше не викликають.
+        while not self.stopped.wait(interval):
+            with self.lock:
+                self.purge(time.monotonic())
+
+def ttl_cache(ttl, maxsize=None, sweep_interval=None, stale_while_revalidate=0, typed=False):
+    # Фабрика декораторів для TTL-кешування з заданим часом життя (ttl, секунди).
+    # Кожна функція має власне сховище; прострочені записи прибираються при кожному записі
+    # та, якщо задано sweep_interval, фоновим потоком. maxsize обмежує кількість записів
+    # (першими витісняються ті, що прострочаться найшвидше).
+    # Одночасні промахи з тим самим ключем виконують функцію один раз, решта чекає результату.
+    # stale_while_revalidate — скільки секунд після закінчення ttl віддавати старий результат,
+    # поки один фоновий потік обчислює новий.
     def decorator(func):
-        nonlocal cache
+        store = TTLStore(ttl, maxsize, stale_while_revalidate)
+        stats = store.stats
+
+        def compute(key, flight, args, kwargs):
+            try:
+                flight.result = func(*args, **kwargs)
+            except BaseException as e:
+                flight.error = e
+            with store.lock:
+                stats["computations"] += 1
+                if flight.error is None:
+                    store.put(key, flight.result, time.monotonic())
+                del store.flights[key]
+            flight.finish()
+
+        def refresh(key, flight, args, kwargs):
+            compute(key, flight, args, kwargs)
+            if flight.error is not None:
+                with store.lock:
+                    stats["refresh_errors"] += 1
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            nonlocal cache
-            # Формуємо ключ з аргументів функції (args, kwargs).
-            key = (args, frozenset(kwargs.items()))
-            current_time = time.time()  # Отримуємо поточний час.
-            if key in cache:
-                result, timestamp = cache[key]
-                # Якщо з моменту збереження результату минуло менше, ніж ttl, повертаємо кеш.
-                if current_time - timestamp < ttl:
-                    print("[CACHE]")
-                    return result
-            # Якщо кеш відсутній або час життя вичерпано, викликаємо функцію.
-            result = func(*args, **kwargs)
-            cache[key] = (result, current_time)
-            return result
+            key = make_key(args, kwargs, typed)
+            now = time.monotonic()
+            with store.lock:
+                entry = store.entries.get(key)
+                if entry is not None and now < entry[2]:
+                    if now < entry[1]:
+                        stats["hits"] += 1
+                        return entry[0]
+                    # Застарілий результат: віддаємо його і запускаємо одне фонове оновлення
+                    stats["stale_hits"] += 1
+                    if key not in store.flights:
+                        stats["refreshes"] += 1
+                        store.flights[key] = flight = Flight()
+                        threading.Thread(target=refresh, args=(key, flight, args, kwargs), daemon=True).start()
+                    return entry[0]
+                flight = store.flights.get(key)
+                if flight is None:
+                    stats["misses"] += 1
+                    store.flights[key] = flight = Flight()
+                    leader = True
+                else:
+                    stats["waits"] += 1
+                    leader = False
+            if leader:
+                compute(key, flight, args, kwargs)
+            else:
+                flight.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        def cache_info():
+            with store.lock:
+                return dict(stats, currsize=len(store.entries), heapsize=len(store.heap), in_flight=len(store.flights))
+
+        def cache_clear():
+            with store.lock:
+                store.entries.clear()
+                store.heap.clear()
+
+        def cache_close():
+            # Зупиняє фоновий потік прибирання.
+            store.stopped.set()
+
+        if sweep_interval is not None:
+            store.sweeper = threading.Thread(target=store.sweep, args=(sweep_interval,), daemon=True)
+            store.sweeper.start()
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_close = cache_close
         return wrapper
     return decorator
 
@@ -280,6 +894,82 @@ def get_data(x):
     print("Result ...")
     return x * 10
 
+def benchmark_ttl_cache(keys=100_000, threads=32, hot_keys=200, rounds=3):
+    # 1) threads потоків одночасно запитують ті самі hot_keys ключів повільної функції
+    #    (кожні rounds разів після закінчення ttl): скільки разів функцію виконано насправді;
+    # 2) потоки записують keys різних ключів з коротким ttl: скільки записів і пам'яті
+    #    лишається після закінчення ttl — у старій реалізації та в новій з фоновим прибиранням.
+    import tracemalloc
+
+    def legacy_ttl_cache(ttl):
+        cache = {}
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                key = (args, frozenset(kwargs.items()))
+                current_time = time.time()
+                if key in cache:
+                    result, timestamp = cache[key]
+                    if current_time - timestamp < ttl:
+                        return result
+                result = func(*args, **kwargs)
+                cache[key] = (result, current_time)
+                return result
+            wrapper.cache = cache
+            return wrapper
+        return decorator
+
+    def run_threads(target):
+        workers = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    for label, make in (("старий ttl_cache", lambda: legacy_ttl_cache(1.0)),
+                        ("новий ttl_cache", lambda: ttl_cache(1.0))):
+        computations = 0
+        counter_lock = threading.Lock()
+
+        @make()
+        def slow(x):
+            nonlocal computations
+            with counter_lock:
+                computations += 1
+            time.sleep(0.002)
+            return x * 2
+
+        barrier = threading.Barrier(threads)
+
+        def hammer(offset):
+            for _ in range(rounds):
+                barrier.wait()
+                for i in range(hot_keys):
+                    slow((i + offset) % hot_keys)
+                barrier.wait()
+                if offset == 0:
+                    time.sleep(1.05)
+        began = time.perf_counter()
+        run_threads(hammer)
+        print(f"{label:>17}: {threads} потоків x {hot_keys} ключів x {rounds} поколінь — "
+              f"обчислень {computations} (мінімум {hot_keys * rounds}), {time.perf_counter() - began:.2f} с")
+
+    for label, make in (("старий ttl_cache", lambda: legacy_ttl_cache(0.2)),
+                        ("новий ttl_cache", lambda: ttl_cache(0.2, sweep_interval=0.05))):
+        tracemalloc.start()
+        cached = make()(lambda x: [x])
+        began = time.perf_counter()
+        run_threads(lambda offset: [cached(i) for i in range(offset, keys, threads)])
+        elapsed = time.perf_counter() - began
+        filled = tracemalloc.get_traced_memory()[0]
+        time.sleep(0.5)
+        remaining = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        size = len(cached.cache) if hasattr(cached, "cache") else cached.cache_info()["currsize"]
+        print(f"{label:>17}: {keys:,} ключів за {elapsed:.2f} с, пам'ять {filled / 2**20:.1f} МБ; "
+              f"після ttl — записів {size:,}, пам'ять {remaining / 2**20:.1f} МБ")
+        if hasattr(cached, "cache_close"):
+            cached.cache_close()
+
 #############################################
 # 15. Декоратор для збору метрик викликів функції
 #############################################
@@ -326,6 +1016,78 @@ def register_user(data):
     # Функція для реєстрації користувача. Повертає повідомлення про успішну реєстрацію.
     return f"Користувача {data['username']} зареєстровано"
 
+#############################################
+# 17. Кешування результатів асинхронних функцій
+#############################################
+def async_cache(maxsize=128, ttl=None, typed=False):
+    # Фабрика декораторів для корутинних функцій: кешується результат await, а не об'єкт корутини.
+    # Одночасні виклики з тим самим ключем чекають одну спільну задачу. Якщо скасовано
+    # одного з тих, хто чекає, інші отримують результат; якщо скасовано всіх — задача
+    # скасовується і нічого не кешується. Виключення не кешуються.
+    # maxsize — обмеження кількості записів (LRU), ttl — час життя запису в секундах (None — без обмеження).
+    # Кеш розрахований на один потік з циклом подій (як і самі корутини).
+    if maxsize is not None and maxsize <= 0:
+        raise ValueError("maxsize має бути додатним або None")
+
+    def decorator(func):
+        entries = OrderedDict()  # ключ -> (результат, момент закінчення або None)
+        flights = {}             # ключ -> [задача, кількість викликів, що її чекають]
+        stats = {"hits": 0, "misses": 0, "waits": 0, "evictions": 0, "expirations": 0}
+
+        def store(key, flight, task):
+            # Скасовану задачу wrapper уже прибрав з flights, і під тим самим ключем може бути нова
+            if flights.get(key) is flight:
+                del flights[key]
+            if task.cancelled() or task.exception() is not None:
+                return
+            entries[key] = (task.result(), None if ttl is None else time.monotonic() + ttl)
+            entries.move_to_end(key)
+            while maxsize is not None and len(entries) > maxsize:
+                entries.popitem(last=False)
+                stats["evictions"] += 1
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs, typed)
+            entry = entries.get(key)
+            if entry is not None:
+                if entry[1] is None or time.monotonic() < entry[1]:
+                    stats["hits"] += 1
+                    entries.move_to_end(key)
+                    return entry[0]
+                del entries[key]
+                stats["expirations"] += 1
+            flight = flights.get(key)
+            # Завершена задача (done-callback ще не виконано) чи та, що скасовується, не підходить:
+            # новий виклик отримав би чужий CancelledError
+            if flight is None or flight[0].done() or flight[0].cancelling():
+                stats["misses"] += 1
+                flight = flights[key] = [asyncio.ensure_future(func(*args, **kwargs)), 0]
+                flight[0].add_done_callback(functools.partial(store, key, flight))
+            else:
+                stats["waits"] += 1
+            flight[1] += 1
+            try:
+                # shield: скасування цього виклику не скасовує спільну задачу для інших
+                return await asyncio.shield(flight[0])
+            finally:
+                flight[1] -= 1
+                if flight[1] == 0 and not flight[0].done():
+                    if flights.get(key) is flight:
+                        del flights[key]
+                    flight[0].cancel()
+
+        def cache_info():
+            return dict(stats, currsize=len(entries), in_flight=len(flights))
+
+        def cache_clear():
+            entries.clear()
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
 #############################################
 # Основний блок виконання (if __name__ == '__main__')
 #############################################
@@ -410,8 +1172,8 @@ if __name__ == '__main__':
     print(api_request("/info"))    # Виклик 3
     try:
         print(api_request("/extra"))  # Виклик, що перевищує ліміт
-    except Exception as e:
-        print("Error 404")
+    except RateLimitExceeded as e:
+        print(f"Error 429: повторіть через {e.retry_after:.0f} с")
     print()
 
     # 12. Тест кешування функцій (simple_cache).
@@ -425,6 +1187,7 @@ if __name__ == '__main__':
     print("Result", slow_func(5))
     print("Result", slow_func(5))
     print("Result", slow_func(4))
+    print(slow_func.cache_info())
     print()
 
     # 13. Тест перевірки прав доступу (require_admin).
@@ -451,6 +1214,7 @@ if __name__ == '__main__':
     print(f"Result: {get_data(3)}")
     time.sleep(3)
     print(f"Result: {get_data(3)}")
+    print(get_data.cache_info())
     print()
 
     # 15. Тест збору метрик викликів функції (metrics_collector).
@@ -467,3 +1231,9 @@ if __name__ == '__main__':
         print("Register:", register_user({"username": "bob"}))
     except ValueError as e:
         print("Error:", e)
+
+    if "--bench" in sys.argv:
+        benchmark_cache_overhead()
+        benchmark_ttl_cache()
+        benchmark_rate_limiter()
+        stress_shared_limiter()
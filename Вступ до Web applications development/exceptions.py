@@ -134,15 +134,31 @@ def process_payment(amount, balance):
 # 10. Функція для отримання даних користувача з бази даних SQLite
 #############################################
 import sqlite3
-def fetch_user_data(user_id):
+
+# Читання рядка користувача для кешу: None, якщо користувача немає; помилки бази не перехоплюються,
+# тож кеш не запам'ятовує їх як "користувача немає".
+def load_user_row(user_id):
+    connection = sqlite3.connect("example.db")
+    try:
+        return connection.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+    finally:
+        connection.close()
+
+# cache — кеш користувачів з get_by_id(user_id, loader) (наприклад, user_cache з ORM&SQL/user_cache.py):
+# повторні запити того самого користувача не відкривають з'єднання з базою.
+def fetch_user_data(user_id, cache=None):
     connection = None  # Ініціалізуємо змінну для з'єднання з базою даних.
     try:
-        # Підключаємось до бази даних "example.db".
-        connection = sqlite3.connect("example.db")
-        cursor = connection.cursor()  # Отримуємо об'єкт курсора для виконання запитів.
-        # Виконуємо SQL-запит для отримання даних користувача за заданим user_id.
-        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        data = cursor.fetchone()  # Отримуємо перший рядок результату.
+        if cache is not None:
+            # Рядок береться з кешу; до бази звертаємось лише при промаху.
+            data = cache.get_by_id(user_id, loader=lambda: load_user_row(user_id))
+        else:
+            # Підключаємось до бази даних "example.db".
+            connection = sqlite3.connect("example.db")
+            cursor = connection.cursor()  # Отримуємо об'єкт курсора для виконання запитів.
+            # Виконуємо SQL-запит для отримання даних користувача за заданим user_id.
+            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+            data = cursor.fetchone()  # Отримуємо перший рядок результату.
         # Якщо дані не знайдено, викликаємо LookupError.
         if data is None:
             raise LookupError("Користувача не знайдено")
@@ -299,6 +315,21 @@ if __name__ == '__main__':
         print(f"Дані користувача: {user}")
     else:
         print("Помилка при отриманні даних користувача")
+    # Ті самі запити через кеш користувачів з ORM&SQL/user_cache.py (потрібен SQLAlchemy).
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ORM&SQL"))
+    try:
+        from user_cache import user_cache
+    except ImportError:
+        user_cache = None
+    if user_cache is not None:
+        for _ in range(3):
+            try:
+                print(f"Дані користувача (кеш): {fetch_user_data(1, cache=user_cache)}")
+            except LookupError as e:
+                print(e)
+        print(f"Метрики кешу: {user_cache.stats()}")
     print()
 
     # 11. Аутентифікація користувача.
@@ -0,0 +1,33 @@
+# Тести архівації бронювань (ORM&SQL/archive.py) на тимчасовій базі
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ORM&SQL"))
+
+from intro_orm import registry, add_table, book_table
+from archive import archive_reservations, reservations_between
+
+# Тимчасова база restaurant з одним столиком на 4 місця
+@pytest.fixture
+def restaurant():
+    with registry.temporary("restaurant"):
+        add_table(4)
+        yield
+
+# Бронювання, що триває після cutoff, лишається в робочій таблиці й далі займає столик
+def test_running_reservation_is_not_archived(restaurant):
+    book_table(2, datetime(2025, 4, 30, 23, 0), 180)
+    assert archive_reservations(datetime(2025, 5, 1)) == {}
+    assert book_table(2, datetime(2025, 5, 1, 0, 30)) is None
+
+# Бронювання, що закінчилось рівно в cutoff, архівується, і столик знову вільний
+def test_finished_reservation_is_archived(restaurant):
+    book_table(2, datetime(2025, 4, 30, 21, 0), 180)
+    book_table(2, datetime(2025, 4, 10, 18, 0))
+    assert archive_reservations(datetime(2025, 5, 1)) == {"2025_04": 2}
+    assert reservations_between(datetime(2025, 4, 1), datetime(2025, 5, 1)) == []
+    assert len(reservations_between(datetime(2025, 4, 1), datetime(2025, 5, 1), include_archive=True)) == 2
+    assert book_table(2, datetime(2025, 5, 1, 0, 30)) is not None
@@ -0,0 +1,50 @@
+# Тести кешу імен сесії (NameCache у ORM&SQL/intro_orm.py): застарілі id не потрапляють в оцінки
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ORM&SQL"))
+
+import sqlalchemy as db
+
+from intro_orm import registry, Student, Grade, add_student, add_subject, give_grade, resolve_ids
+
+# Тимчасова база school з предметом Math
+@pytest.fixture
+def school():
+    with registry.temporary("school"):
+        add_subject("Math")
+        yield
+
+def grades_count():
+    with registry.reading("school") as session:
+        return session.scalar(db.select(db.func.count(Grade.id)))
+
+# id студента з відкоченої транзакції не лишається в кеші сесії
+def test_rollback_clears_cache(school):
+    session = registry.session("school")
+    session.add(Student(name="Bob", group="Python"))
+    session.flush()
+    assert resolve_ids(session, Student, ["Bob"])["Bob"]
+    session.rollback()
+    give_grade("Bob", "Math", 90)
+    assert grades_count() == 0
+
+# Видалення студента в іншій сесії (іншому потоці) скидає кеш сесії поточного потоку
+def test_delete_in_other_session_invalidates_cache(school):
+    add_student("Bob", "Python")
+    give_grade("Bob", "Math", 90)
+
+    def delete_bob():
+        with registry.unit_of_work("school") as session:
+            session.execute(db.delete(Grade))
+            session.delete(session.scalars(db.select(Student).filter_by(name="Bob")).one())
+        registry.remove("school")
+
+    thread = threading.Thread(target=delete_bob)
+    thread.start()
+    thread.join()
+    give_grade("Bob", "Math", 80)
+    assert grades_count() == 0
@@ -0,0 +1,54 @@
+# Тести узгодженості кешу календаря бронювань (ORM&SQL/reservation_calendar.py) з базою
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ORM&SQL"))
+
+import async_orm
+from intro_orm import registry, add_table, book_table
+from reservation_calendar import calendar_cache, fuzz_consistency
+
+# Тимчасова база restaurant зі столиками на 2 та 4 місця
+@pytest.fixture
+def restaurant():
+    with registry.temporary(calendar_cache.name):
+        add_table(2)
+        add_table(4)
+        yield
+
+# Бронювання після першого звернення до дня оновлює кеш без повторного завантаження
+def test_booking_updates_loaded_day(restaurant):
+    moment = datetime(2025, 4, 17, 18, 0)
+    assert calendar_cache.free_tables(2, moment) == [1, 2]
+    book_table(2, moment)
+    assert calendar_cache.free_tables(2, moment) == [2]
+    assert calendar_cache.free_tables(2, moment.replace(hour=19)) == [1, 2]
+
+# Бронювання, що перетинає північ, займає столик і в кеші наступного дня
+def test_booking_across_midnight(restaurant):
+    assert calendar_cache.free_tables(4, datetime(2025, 4, 18, 0, 30)) == [2]
+    book_table(4, datetime(2025, 4, 17, 23, 0), 120)
+    assert calendar_cache.free_tables(4, datetime(2025, 4, 18, 0, 30)) == []
+
+# Бронювання через AsyncSession (async_orm.py) теж оновлює кеш
+def test_async_booking_updates_cache(restaurant):
+    async def book(moment):
+        try:
+            return await async_orm.book_table(2, moment)
+        finally:
+            await async_orm.async_registry.dispose()
+
+    moment = datetime(2025, 4, 17, 18, 0)
+    assert calendar_cache.free_tables(2, moment) == [1, 2]
+    assert asyncio.run(book(moment)) is not None
+    assert calendar_cache.free_tables(2, moment) == [2]
+
+# Випадкові бронювання, скасування, відкочені транзакції та зміни через Core:
+# після кожної операції відповіді кешу збігаються з SQL-запитом free_tables_query
+@pytest.mark.parametrize("seed", [1, 2])
+def test_cache_matches_database(seed):
+    assert fuzz_consistency(operations=100, checks_per_operation=5, seed=seed)